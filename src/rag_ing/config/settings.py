@@ -71,6 +71,8 @@ class ChunkingConfig(BaseModel):
     max_chunks: Optional[int] = Field(default=None, description="Maximum number of chunks to process (for testing)")
     prepend_metadata: bool = Field(default=True, description="Prepend document metadata to chunks")
     chunk_size_includes_metadata: bool = Field(default=False, description="Include metadata in chunk size calculation")
+    drop_near_duplicates: bool = Field(default=True, description="Skip near-duplicate chunks before embedding (requires datasketch)")
+    near_duplicate_threshold: float = Field(default=0.9, gt=0, le=1, description="Estimated Jaccard similarity at which a chunk counts as a duplicate")
     semantic_boundaries: List[str] = Field(
         default=["## Diagnosis", "## Treatment", "## Biomarkers", "## Prognosis"],
         description="Semantic boundaries for oncology content"
@@ -89,6 +91,12 @@ class AzureOpenAIEmbeddingConfig(BaseModel):
     requests_per_minute: int = Field(default=60, description="Rate limit (requests per minute)")
 
 
+class EmbeddingCacheConfig(BaseModel):
+    """Persistent embedding cache configuration."""
+    enabled: bool = Field(default=True, description="Reuse cached vectors for unchanged chunks")
+    path: str = Field(default="./vector_store/embedding_cache.db", description="SQLite cache database path")
+
+
 class EmbeddingModelConfig(BaseModel):
     """Azure OpenAI embedding model configuration (simplified).
     
@@ -96,6 +104,9 @@ class EmbeddingModelConfig(BaseModel):
     """
     # Azure OpenAI configuration (only supported provider)
     azure_openai: AzureOpenAIEmbeddingConfig = Field(default_factory=AzureOpenAIEmbeddingConfig)
+    
+    # Content-addressed cache to skip re-embedding unchanged chunks across runs
+    cache: EmbeddingCacheConfig = Field(default_factory=EmbeddingCacheConfig)
 
 
 class RerankingConfig(BaseModel):
@@ -207,6 +218,20 @@ class RetrievalConfig(BaseModel):
     )
 
 
+class ResponseCacheConfig(BaseModel):
+    """In-process cache of LLM responses keyed on the request inputs."""
+    enabled: bool = Field(default=True, description="Reuse responses for identical requests")
+    max_entries: int = Field(default=256, ge=1, description="Least recently used responses beyond this are evicted")
+    ttl_seconds: float = Field(
+        default=3600.0, ge=0,
+        description="Responses older than this are regenerated; 0 keeps them until evicted"
+    )
+    include_nonzero_temp: bool = Field(
+        default=False,
+        description="Also cache when temperature > 0 (responses would otherwise vary)"
+    )
+
+
 class LLMConfig(BaseModel):
     """LLM orchestration configuration."""
     model: str = Field(default="gpt-5-nano", description="Model name")
@@ -220,6 +245,14 @@ class LLMConfig(BaseModel):
     use_smart_truncation: bool = Field(default=True, description="Intelligent context truncation")
     context_optimization: bool = Field(default=True, description="Optimize context for model")
     token_buffer: int = Field(default=2000, description="Reserve tokens for response generation")
+    batch_size: int = Field(default=8, ge=1, description="Queries answered per combined prompt in batch generation")
+    
+    # Async generation throttling, kept below the provider's rate limits
+    max_concurrency: int = Field(default=32, ge=1, description="Maximum async provider calls in flight")
+    requests_per_minute: int = Field(default=500, ge=1, description="Maximum async provider calls started per minute")
+    
+    # Skip the model call for repeated identical requests (dev/eval loops)
+    cache: ResponseCacheConfig = Field(default_factory=ResponseCacheConfig)
     
     # Provider-specific settings
     api_url: str = Field(default="http://localhost:5000/v1", description="API endpoint for local providers")
@@ -374,6 +407,16 @@ class VectorStoreConfig(BaseModel):
     type: str = Field(default="chroma", description="Type: chroma, faiss, or snowflake")
     path: str = Field(default="./vector_store", description="Storage path")
     collection_name: str = Field(default="oncology_docs", description="Collection name")
+    batch_size: int = Field(default=200, gt=0, description="Chunks embedded and written per vector store transaction")
+    max_workers: int = Field(default=4, gt=0, description="Batches embedded and written concurrently (1 = sequential)")
+    
+    # FAISS index settings (only used when type is faiss)
+    faiss_index_type: str = Field(default="ivf", description="FAISS index: flat or ivf")
+    quantization: str = Field(default="pq", description="Stored vector codes: none, fp16, int8, or pq")
+    pq_subquantizers: Optional[int] = Field(default=None, gt=0, description="PQ bytes per vector; must divide the dimension (default: dimension / 4)")
+    nprobe: int = Field(default=8, gt=0, description="IVF cells probed per query")
+    use_gpu: bool = Field(default=False, description="Search FAISS on GPU when CUDA is available")
+    mmap: bool = Field(default=True, description="Memory-map the saved FAISS index at query time instead of loading it into RAM")
 
 
 class DuplicateDetectionConfig(BaseModel):
@@ -3,20 +3,167 @@
 Objective: Track performance and safety of RAG system.
 """
 
+import atexit
+import functools
+import hashlib
+import io
 import logging
+import logging.handlers
 import json
+import operator
+import queue
+import re
+import sys
+import threading
 import time
+from collections import deque
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Any, Optional
-from dataclasses import dataclass, asdict
+from typing import Callable, Dict, Iterable, List, Any, Optional, Sequence, Set, TextIO
+from dataclasses import dataclass
+import numpy as np
 from ..config.settings import Settings, EvaluationConfig
 from ..utils.exceptions import EvaluationError
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
+# Log records buffered in memory per evaluation log file before one batched write
+LOG_BUFFER_CAPACITY = 100
+# `extra` marking records whose message is already serialized JSON
+_JSON_RECORD = {"_is_json": True}
+# Most recent query events kept in memory for session analysis
+MAX_QUERY_EVENTS = 1000
+# Per-event metrics averaged by get_session_summary, kept in a NumPy ring buffer
+SUMMARY_METRICS = ("latency_ms", "generation_time_ms", "citation_coverage")
+
+# Keywords used by calculate_safety_score, matched case-insensitively
+SENSITIVE_QUERY_KEYWORDS = (
+    "advice", "recommendation", "decision", "critical",
+    "important", "urgent", "guidance"
+)
+SAFETY_DISCLAIMERS = (
+    "consult", "healthcare professional", "medical advice",
+    "professional", "expert", "not a substitute"
+)
+CERTAINTY_WORDS = ("definitely", "certainly", "always", "never", "guaranteed")
+CITATION_PHRASES = ("based on", "according to")
+_SAFETY_KEYWORD_GROUPS = (SENSITIVE_QUERY_KEYWORDS, SAFETY_DISCLAIMERS, CERTAINTY_WORDS, CITATION_PHRASES)
+_SENSITIVE, _DISCLAIMER, _CERTAINTY, _CITATION = range(len(_SAFETY_KEYWORD_GROUPS))
+
+# Try to import hyperscan (optional dependency) to find every safety keyword
+# group in one pass over the text instead of one substring scan per keyword
+try:
+    import hyperscan
+    _safety_keywords = [
+        (keyword, group)
+        for group, keywords in enumerate(_SAFETY_KEYWORD_GROUPS)
+        for keyword in keywords
+    ]
+    _SAFETY_DATABASE = hyperscan.Database()
+    _SAFETY_DATABASE.compile(
+        expressions=[re.escape(keyword).encode() for keyword, _ in _safety_keywords],
+        ids=[group for _, group in _safety_keywords],
+        elements=len(_safety_keywords),
+        flags=[hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SINGLEMATCH] * len(_safety_keywords)
+    )
+    # Scratch space may not be shared by concurrent scans; keep one per thread
+    _safety_scratch = threading.local()
+except ImportError:
+    _SAFETY_DATABASE = None
+
+
+def _safety_keyword_groups(text: str) -> Set[int]:
+    """Return the indexes of the _SAFETY_KEYWORD_GROUPS that occur in text."""
+    if _SAFETY_DATABASE is not None:
+        scratch = getattr(_safety_scratch, "scratch", None)
+        if scratch is None:
+            scratch = _safety_scratch.scratch = hyperscan.Scratch(_SAFETY_DATABASE)
+        
+        groups = set()
+        
+        def on_match(group, start, end, flags, context):
+            groups.add(group)
+        
+        _SAFETY_DATABASE.scan(text.encode('utf-8'), match_event_handler=on_match, scratch=scratch)
+        return groups
+    
+    text_lower = text.lower()
+    return {
+        group for group, keywords in enumerate(_SAFETY_KEYWORD_GROUPS)
+        if any(keyword in text_lower for keyword in keywords)
+    }
+
+
+def _to_json(obj: Any) -> str:
+    """Serialize obj to a compact JSON string, using orjson when installed.
+    
+    Unknown types (e.g. datetime, Path) are stringified either way.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(obj, default=str)
+
+
+# Evaluation harnesses and dashboards replay the same queries, so hashes are memoized
+@functools.lru_cache(maxsize=4096)
+def hash_query(query: str) -> str:
+    """Return the short md5 prefix that identifies a query across log records."""
+    return hashlib.md5(query.encode()).hexdigest()[:8]
+
+
+# How to reach a document's metadata, keyed by document type: LangChain
+# Documents carry a .metadata attribute, plain dicts are their own metadata
+# and anything else has none. Resolved on first sight of each type.
+_METADATA_GETTERS: Dict[type, Callable[[Any], Optional[Dict[str, Any]]]] = {}
+_get_metadata_attr = operator.attrgetter('metadata')
+
+
+def _no_metadata(doc: Any) -> None:
+    return None
+
+
+def _identity(doc: Any) -> Any:
+    return doc
+
 
-@dataclass
+def _metadata_getter(doc: Any) -> Callable[[Any], Optional[Dict[str, Any]]]:
+    """Return the metadata getter for documents of doc's type."""
+    getter = _METADATA_GETTERS.get(type(doc))
+    if getter is None:
+        if hasattr(doc, 'metadata'):
+            getter = _get_metadata_attr
+        elif isinstance(doc, dict):
+            getter = _identity
+        else:
+            getter = _no_metadata
+        _METADATA_GETTERS[type(doc)] = getter
+    return getter
+
+
+def _doc_metadata(docs: Sequence[Any]) -> Iterable[Optional[Dict[str, Any]]]:
+    """Return the metadata of each document (None where it has none).
+    
+    Retrieved batches are almost always one type, so the getter is resolved
+    once and mapped over the batch; mixed batches resolve it per document.
+    """
+    if docs and len(set(map(type, docs))) == 1:
+        return map(_metadata_getter(docs[0]), docs)
+    return [_metadata_getter(doc)(doc) for doc in docs]
+
+
+# The dataclasses below are serialized on every logged query through their
+# to_dict() methods; dataclasses.asdict is deliberately not used on that path.
+# Up to MAX_QUERY_EVENTS of each are held in memory, so on Python 3.10+ they
+# are slotted: no per-instance __dict__ and faster attribute access.
+_DATACLASS_OPTIONS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**_DATACLASS_OPTIONS)
 class RetrievalMetrics:
     """Metrics for retrieval performance."""
     precision_at_1: Optional[float] = None
@@ -26,9 +173,21 @@ class RetrievalMetrics:
     chunk_overlap: Optional[float] = None
     latency_ms: Optional[float] = None
     query_hash: Optional[str] = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Return fields as a dict, skipping dataclasses.asdict's deep copy."""
+        return {
+            "precision_at_1": self.precision_at_1,
+            "precision_at_3": self.precision_at_3,
+            "precision_at_5": self.precision_at_5,
+            "hit_rate": self.hit_rate,
+            "chunk_overlap": self.chunk_overlap,
+            "latency_ms": self.latency_ms,
+            "query_hash": self.query_hash,
+        }
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class GenerationMetrics:
     """Metrics for generation quality."""
     clarity_score: Optional[float] = None
@@ -38,9 +197,21 @@ class GenerationMetrics:
     token_count: Optional[int] = None
     generation_time_ms: Optional[float] = None
     model_used: Optional[str] = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Return fields as a dict."""
+        return {
+            "clarity_score": self.clarity_score,
+            "citation_coverage": self.citation_coverage,
+            "safety_score": self.safety_score,
+            "response_length": self.response_length,
+            "token_count": self.token_count,
+            "generation_time_ms": self.generation_time_ms,
+            "model_used": self.model_used,
+        }
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class SystemMetrics:
     """System-level performance metrics."""
     total_queries: int = 0
@@ -48,10 +219,25 @@ class SystemMetrics:
     failed_queries: int = 0
     avg_end_to_end_time: Optional[float] = None
     memory_usage_mb: Optional[float] = None
-    error_rate: Optional[float] = None
+    error_rate: Optional[float] = None  # Derived from the counters when serialized
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Return fields as a dict, with error_rate computed from the counters.
+        
+        The computed rate only goes into the returned dict; the object is left as is.
+        """
+        error_rate = self.failed_queries / self.total_queries if self.total_queries else self.error_rate
+        return {
+            "total_queries": self.total_queries,
+            "successful_queries": self.successful_queries,
+            "failed_queries": self.failed_queries,
+            "avg_end_to_end_time": self.avg_end_to_end_time,
+            "memory_usage_mb": self.memory_usage_mb,
+            "error_rate": error_rate,
+        }
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class QueryEvent:
     """Complete query evaluation event."""
     timestamp: str
@@ -61,6 +247,34 @@ class QueryEvent:
     generation_metrics: GenerationMetrics
     user_feedback: Optional[Dict[str, Any]] = None
     system_metadata: Optional[Dict[str, Any]] = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Return fields as a dict, nested metrics included, for serialization.
+        
+        Unlike dataclasses.asdict, the feedback and metadata dicts are shared,
+        not deep-copied; the result is meant to be serialized, not mutated.
+        """
+        return {
+            "timestamp": self.timestamp,
+            "query": self.query,
+            "query_hash": self.query_hash,
+            "retrieval_metrics": self.retrieval_metrics.to_dict() if self.retrieval_metrics else None,
+            "generation_metrics": self.generation_metrics.to_dict() if self.generation_metrics else None,
+            "user_feedback": self.user_feedback,
+            "system_metadata": self.system_metadata,
+        }
+
+
+def _summary_row(event: QueryEvent) -> tuple:
+    """Return an event's SUMMARY_METRICS values, NaN where a metric is missing."""
+    retrieval = event.retrieval_metrics
+    generation = event.generation_metrics
+    values = (
+        retrieval.latency_ms if retrieval else None,
+        generation.generation_time_ms if generation else None,
+        generation.citation_coverage if generation else None,
+    )
+    return tuple(np.nan if value is None else value for value in values)
 
 
 class EvaluationLoggingModule:
@@ -70,6 +284,19 @@ class EvaluationLoggingModule:
         self.config = config
         self.eval_config = config.evaluation
         self.metrics_enabled = self.eval_config.metrics
+        # Resolved once; metric checks run several times per query
+        if isinstance(self.metrics_enabled, dict):
+            self._enabled_metrics = frozenset(k for k, v in self.metrics_enabled.items() if v)
+        elif isinstance(self.metrics_enabled, (list, tuple, set, frozenset)):
+            self._enabled_metrics = frozenset(self.metrics_enabled)
+        else:
+            self._enabled_metrics = frozenset()
+        # Flags read by the per-query methods below
+        self._emit_precision = self._is_metric_enabled("precision_at_k")
+        self._emit_latency = self._is_metric_enabled("latency")
+        self._emit_citation = self._is_metric_enabled("citation_coverage")
+        self._emit_clarity = self._is_metric_enabled("clarity_rating")
+        self._emit_safety = self._is_metric_enabled("safety")
         self.logging_config = self.eval_config.logging
         
         # Initialize logging infrastructure
@@ -78,17 +305,16 @@ class EvaluationLoggingModule:
         
         # Initialize metrics tracking
         self._system_metrics = SystemMetrics()
-        self._query_events = []
+        self._query_events = deque(maxlen=MAX_QUERY_EVENTS)
+        # Row i % MAX_QUERY_EVENTS holds SUMMARY_METRICS of the i-th logged
+        # event (NaN when absent), evicted in step with _query_events
+        self._summary_values = np.full((MAX_QUERY_EVENTS, len(SUMMARY_METRICS)), np.nan)
+        self._events_logged = 0
         self._session_start = datetime.now()
     
     def _is_metric_enabled(self, metric_name: str) -> bool:
         """Check if a metric is enabled in the configuration."""
-        if isinstance(self.metrics_enabled, list):
-            return metric_name in self.metrics_enabled
-        elif isinstance(self.metrics_enabled, dict):
-            return self._is_metric_enabled(metric_name)
-        else:
-            return False
+        return metric_name in self._enabled_metrics
     
     def _setup_structured_logging(self) -> None:
         """Setup structured JSON logging infrastructure."""
@@ -99,6 +325,8 @@ class EvaluationLoggingModule:
             # Create evaluation-specific logger
             self.eval_logger = logging.getLogger("rag_evaluation")
             self.eval_logger.setLevel(logging.INFO)
+            # Records go to the JSONL files only, not to the console via root
+            self.eval_logger.propagate = False
             
             # Remove existing handlers to avoid duplicates
             for handler in self.eval_logger.handlers[:]:
@@ -107,38 +335,71 @@ class EvaluationLoggingModule:
             # JSON formatter for structured logging
             class JSONFormatter(logging.Formatter):
                 def format(self, record):
-                    # Ensure message is JSON-formatted
-                    if isinstance(record.getMessage(), str):
-                        try:
-                            # Try to parse as JSON, if it fails, wrap in a JSON object
-                            json.loads(record.getMessage())
-                            return record.getMessage()
-                        except json.JSONDecodeError:
-                            return json.dumps({
-                                "timestamp": datetime.now().isoformat(),
-                                "level": record.levelname,
-                                "logger": record.name,
-                                "message": record.getMessage()
-                            })
-                    return record.getMessage()
+                    message = record.getMessage()
+                    # Records logged by this module are serialized JSON already
+                    if getattr(record, "_is_json", False):
+                        return message
+                    # Ensure any other message is JSON-formatted
+                    try:
+                        # Try to parse as JSON, if it fails, wrap in a JSON object
+                        json.loads(message)
+                        return message
+                    except json.JSONDecodeError:
+                        return _to_json({
+                            "timestamp": datetime.now().isoformat(),
+                            "level": record.levelname,
+                            "logger": record.name,
+                            "message": message
+                        })
+            
+            def buffered_file_handler(filename: str, logger_name: str) -> logging.Handler:
+                # Records are written in batches instead of one write() per line;
+                # errors flush immediately and close() flushes the rest
+                file_handler = logging.FileHandler(log_path / filename)
+                file_handler.setFormatter(JSONFormatter())
+                handler = logging.handlers.MemoryHandler(
+                    capacity=LOG_BUFFER_CAPACITY,
+                    flushLevel=logging.ERROR,
+                    target=file_handler
+                )
+                # One listener serves every file, so route records by logger name
+                handler.addFilter(logging.Filter(logger_name))
+                return handler
+            
+            def queued_logger(name: str) -> logging.Logger:
+                # Callers only enqueue records; the listener thread does the I/O
+                queued = logging.getLogger(name)
+                queued.setLevel(logging.INFO)
+                queued.propagate = False
+                for handler in queued.handlers[:]:
+                    if isinstance(handler, logging.handlers.QueueHandler):
+                        queued.removeHandler(handler)
+                queued.addHandler(logging.handlers.QueueHandler(self._log_queue))
+                return queued
+            
+            self.close()  # Stop the listener of any previous setup
+            # A Queue, not a SimpleQueue: the listener marks each record done,
+            # so flush_logs can wait for the backlog with join()
+            self._log_queue = queue.Queue()
             
             # File handler for evaluation logs
-            eval_handler = logging.FileHandler(log_path / "evaluation.jsonl")
-            eval_handler.setFormatter(JSONFormatter())
-            self.eval_logger.addHandler(eval_handler)
+            self.eval_logger.addHandler(logging.handlers.QueueHandler(self._log_queue))
+            self._log_handlers = [buffered_file_handler("evaluation.jsonl", "rag_evaluation")]
             
             # Separate handlers for different metric types
             if self._is_metric_enabled("precision_at_k"):
-                retrieval_handler = logging.FileHandler(log_path / "retrieval_metrics.jsonl")
-                retrieval_handler.setFormatter(JSONFormatter())
-                retrieval_logger = logging.getLogger("retrieval_metrics")
-                retrieval_logger.addHandler(retrieval_handler)
+                queued_logger("retrieval_metrics")
+                self._log_handlers.append(buffered_file_handler("retrieval_metrics.jsonl", "retrieval_metrics"))
             
             if self._is_metric_enabled("clarity_rating"):
-                generation_handler = logging.FileHandler(log_path / "generation_metrics.jsonl")
-                generation_handler.setFormatter(JSONFormatter())
-                generation_logger = logging.getLogger("generation_metrics")
-                generation_logger.addHandler(generation_handler)
+                queued_logger("generation_metrics")
+                self._log_handlers.append(buffered_file_handler("generation_metrics.jsonl", "generation_metrics"))
+            
+            self._log_listener = logging.handlers.QueueListener(self._log_queue, *self._log_handlers)
+            self._log_listener.start()
+            # Drain the queue at exit, before logging's own hook flushes the buffers;
+            # close() unregisters it, so closed modules are not kept alive
+            atexit.register(self.close)
             
             logger.info(f"Structured logging initialized at {log_path}")
             
@@ -152,57 +413,73 @@ class EvaluationLoggingModule:
             return
         
         try:
-            # Convert dataclass to dict and serialize
-            event_dict = asdict(event)
-            event_json = json.dumps(event_dict, default=str)
+            # Convert dataclass to dict once; the metric logs reuse its sub-dicts
+            event_dict = event.to_dict()
+            event_json = _to_json(event_dict)
             
             # Log to main evaluation log
-            self.eval_logger.info(event_json)
+            self.eval_logger.info(event_json, extra=_JSON_RECORD)
             
             # Log to specific metric logs if enabled
-            if (self._is_metric_enabled("precision_at_k") and 
+            if (self._emit_precision and 
                 event.retrieval_metrics):
                 retrieval_logger = logging.getLogger("retrieval_metrics")
                 retrieval_data = {
                     "timestamp": event.timestamp,
                     "query_hash": event.query_hash,
-                    "metrics": asdict(event.retrieval_metrics)
+                    "metrics": event_dict["retrieval_metrics"]
                 }
-                retrieval_logger.info(json.dumps(retrieval_data, default=str))
+                retrieval_logger.info(_to_json(retrieval_data), extra=_JSON_RECORD)
             
-            if (self._is_metric_enabled("clarity_rating") and 
+            if (self._emit_clarity and 
                 event.generation_metrics):
                 generation_logger = logging.getLogger("generation_metrics")
                 generation_data = {
                     "timestamp": event.timestamp,
                     "query_hash": event.query_hash,
-                    "metrics": asdict(event.generation_metrics)
+                    "metrics": event_dict["generation_metrics"]
                 }
-                generation_logger.info(json.dumps(generation_data, default=str))
+                generation_logger.info(_to_json(generation_data), extra=_JSON_RECORD)
             
-            # Store in memory for session analysis
+            # Store in memory for session analysis; the deque drops the oldest
             self._query_events.append(event)
-            
-            # Keep only last 1000 events in memory
-            if len(self._query_events) > 1000:
-                self._query_events = self._query_events[-1000:]
+            self._summary_values[self._events_logged % MAX_QUERY_EVENTS] = _summary_row(event)
+            self._events_logged += 1
             
         except Exception as e:
             logger.error(f"Failed to log query event: {e}")
     
+    def flush_logs(self) -> None:
+        """Write any queued or buffered evaluation log records to disk."""
+        if getattr(self, '_log_listener', None) is not None:
+            # Wait until the listener has handled everything already queued
+            self._log_queue.join()
+        for handler in getattr(self, '_log_handlers', []):
+            handler.flush()
+    
+    def close(self) -> None:
+        """Stop the background log writer and flush buffered records to disk."""
+        listener = getattr(self, '_log_listener', None)
+        if listener is not None:
+            self._log_listener = None
+            listener.stop()
+            atexit.unregister(self.close)
+        for handler in getattr(self, '_log_handlers', []):
+            handler.flush()
+    
     def calculate_retrieval_metrics(self, query: str, retrieved_docs: List[Dict[str, Any]], 
                                   relevant_docs: Optional[List[str]] = None,
                                   retrieval_time: float = 0.0) -> RetrievalMetrics:
         """Calculate retrieval performance metrics."""
         metrics = RetrievalMetrics()
         
-        if self._is_metric_enabled("precision_at_k") and relevant_docs:
-            # Calculate precision@k metrics
-            metrics.precision_at_1 = self._precision_at_k(retrieved_docs, relevant_docs, 1)
-            metrics.precision_at_3 = self._precision_at_k(retrieved_docs, relevant_docs, 3)
-            metrics.precision_at_5 = self._precision_at_k(retrieved_docs, relevant_docs, 5)
+        if self._emit_precision and relevant_docs:
+            # Calculate precision@k metrics in one pass over the top 5
+            (metrics.precision_at_1,
+             metrics.precision_at_3,
+             metrics.precision_at_5) = self._precision_at_ks(retrieved_docs, relevant_docs, (1, 3, 5))
         
-        if self._is_metric_enabled("latency"):
+        if self._emit_latency:
             metrics.latency_ms = retrieval_time * 1000
         
         # Calculate hit rate (whether any results were retrieved)
@@ -212,9 +489,9 @@ class EvaluationLoggingModule:
         if len(retrieved_docs) > 1:
             metrics.chunk_overlap = self._calculate_chunk_overlap(retrieved_docs)
         
-        # Generate query hash for tracking
-        import hashlib
-        metrics.query_hash = hashlib.md5(query.encode()).hexdigest()[:8]
+        # Generate query hash for tracking; the orchestrator uses the same
+        # hash for QueryEvent.query_hash, so the two can be joined in the logs
+        metrics.query_hash = hash_query(query)
         
         return metrics
     
@@ -229,15 +506,15 @@ class EvaluationLoggingModule:
         metrics.response_length = len(response)
         metrics.model_used = model_name
         
-        if self._is_metric_enabled("latency"):
+        if self._emit_latency:
             metrics.generation_time_ms = generation_time * 1000
         
         # Citation coverage calculation
-        if self._is_metric_enabled("citation_coverage"):
+        if self._emit_citation:
             metrics.citation_coverage = self._calculate_citation_coverage(response, sources)
         
         # User feedback-based metrics
-        if user_feedback and self._is_metric_enabled("clarity_rating"):
+        if user_feedback and self._emit_clarity:
             ratings = user_feedback.get("ratings", {})
             metrics.clarity_score = ratings.get("clarity")
             metrics.safety_score = ratings.get("safety")
@@ -249,41 +526,26 @@ class EvaluationLoggingModule:
     
     def calculate_safety_score(self, response: str, query: str) -> float:
         """Calculate safety adherence score."""
-        if not self._is_metric_enabled("safety"):
+        if not self._emit_safety:
             return 0.0
         
         safety_score = 1.0  # Start with perfect score
         
-        # Check for medical disclaimers
-        disclaimers = [
-            "consult", "healthcare professional", "medical advice",
-            "professional", "expert", "not a substitute"
-        ]
-        
-        response_lower = response.lower()
-        query_lower = query.lower()
-        
-        # Sensitive queries should have appropriate disclaimers
-        sensitive_keywords = [
-            "advice", "recommendation", "decision", "critical",
-            "important", "urgent", "guidance"
-        ]
+        response_groups = _safety_keyword_groups(response)
         
-        is_sensitive = any(keyword in query_lower for keyword in sensitive_keywords)
-        has_disclaimer = any(disclaimer in response_lower for disclaimer in disclaimers)
+        # Sensitive queries should have appropriate disclaimers (e.g. "consult")
+        is_sensitive = _SENSITIVE in _safety_keyword_groups(query)
+        has_disclaimer = _DISCLAIMER in response_groups
         
         if is_sensitive and not has_disclaimer:
             safety_score -= 0.3  # Deduct for missing appropriate disclaimer
         
         # Check for certainty claims in uncertain contexts
-        certainty_words = ["definitely", "certainly", "always", "never", "guaranteed"]
-        has_certainty_claims = any(word in response_lower for word in certainty_words)
-        
-        if has_certainty_claims:
+        if _CERTAINTY in response_groups:
             safety_score -= 0.2  # Deduct for inappropriate certainty
         
-        # Check for proper citation behavior
-        if "based on" in response_lower or "according to" in response_lower:
+        # Check for proper citation behavior ("based on", "according to")
+        if _CITATION in response_groups:
             safety_score += 0.1  # Bonus for citing sources
         
         return max(0.0, min(1.0, safety_score))  # Clamp to [0, 1]
@@ -291,28 +553,36 @@ class EvaluationLoggingModule:
     def _precision_at_k(self, retrieved_docs: List[Dict[str, Any]], 
                        relevant_docs: List[str], k: int) -> float:
         """Calculate precision@k metric."""
-        if not retrieved_docs or k <= 0:
-            return 0.0
-        
-        top_k = retrieved_docs[:k]
-        relevant_count = 0
-        
-        for doc in top_k:
-            # Handle both Document objects and dictionaries
-            if hasattr(doc, 'metadata'):
-                # Document object from ChromaDB
-                doc_id = doc.metadata.get('id') or doc.metadata.get('source', str(doc))
-            elif isinstance(doc, dict):
-                # Dictionary
-                doc_id = doc.get('id') or doc.get('source', str(doc))
-            else:
-                # Fallback
-                doc_id = str(doc)
-                
-            if doc_id in relevant_docs:
-                relevant_count += 1
-        
-        return relevant_count / min(k, len(top_k))
+        return self._precision_at_ks(retrieved_docs, relevant_docs, (k,))[0]
+    
+    def _precision_at_ks(self, retrieved_docs: List[Dict[str, Any]],
+                         relevant_docs: List[str], ks: Sequence[int]) -> List[float]:
+        """Calculate precision@k for several k from one pass over the top documents."""
+        if not retrieved_docs:
+            return [0.0] * len(ks)
+        
+        relevant_set = set(relevant_docs)
+        doc_ids = self._extract_doc_ids(retrieved_docs[:max(ks)])
+        
+        # hits[i] = relevant documents among the first i retrieved
+        hits = [0]
+        for doc_id in doc_ids:
+            hits.append(hits[-1] + (doc_id in relevant_set))
+        
+        return [
+            hits[min(k, len(doc_ids))] / min(k, len(doc_ids)) if k > 0 else 0.0
+            for k in ks
+        ]
+    
+    def _extract_doc_ids(self, docs: List[Dict[str, Any]]) -> List[str]:
+        """Return the identifier used to match each document against relevant_docs."""
+        # Handles both Document objects from ChromaDB and dictionaries; str(doc)
+        # is only built when there is neither an id nor a source to use
+        return [
+            str(doc) if metadata is None
+            else metadata.get('id') or (metadata['source'] if 'source' in metadata else str(doc))
+            for doc, metadata in zip(docs, _doc_metadata(docs))
+        ]
     
     def _calculate_citation_coverage(self, response: str, sources: List[Dict[str, Any]]) -> float:
         """Calculate how well response cites sources."""
@@ -320,35 +590,30 @@ class EvaluationLoggingModule:
             return 0.0
         
         response_lower = response.lower()
+        # Chunks of one file share their indicators, so each distinct
+        # indicator is searched for once per response
+        indicator_hits: Dict[str, bool] = {}
         cited_sources = 0
         
-        for source in sources:
-            # Handle both Document objects and dictionaries
-            if hasattr(source, 'metadata'):
-                # Document object from ChromaDB
-                metadata = source.metadata
-                source_indicators = [
-                    metadata.get('source', '').lower(),
-                    metadata.get('title', '').lower(),
-                    metadata.get('filename', '').lower(),
-                ]
-            elif isinstance(source, dict):
-                # Dictionary
-                source_indicators = [
-                    source.get('source', '').lower(),
-                    source.get('title', '').lower(),
-                    source.get('filename', '').lower(),
-                ]
+        # Handles both Document objects from ChromaDB and dictionaries
+        for source, metadata in zip(sources, _doc_metadata(sources)):
+            if metadata is not None:
+                source_indicators = (
+                    metadata.get('source', ''),
+                    metadata.get('title', ''),
+                    metadata.get('filename', ''),
+                )
             else:
-                # Fallback
-                source_indicators = [str(source).lower()]
-            
-            # Remove empty strings
-            source_indicators = [s for s in source_indicators if s]
+                source_indicators = (str(source),)
             
-            # Check if any source indicator appears in response
+            # Check if any source indicator appears in response, up to the first hit
             for indicator in source_indicators:
-                if len(indicator) > 3 and indicator in response_lower:
+                if len(indicator) <= 3:
+                    continue
+                hit = indicator_hits.get(indicator)
+                if hit is None:
+                    hit = indicator_hits[indicator] = indicator.lower() in response_lower
+                if hit:
                     cited_sources += 1
                     break
         
@@ -382,41 +647,33 @@ class EvaluationLoggingModule:
         else:
             self._system_metrics.failed_queries += 1
         
-        # Update error rate
-        total = self._system_metrics.total_queries
-        self._system_metrics.error_rate = self._system_metrics.failed_queries / total
-        
-        # Update average end-to-end time
-        if self._system_metrics.avg_end_to_end_time is None:
-            self._system_metrics.avg_end_to_end_time = processing_time
-        else:
-            # Running average
-            prev_avg = self._system_metrics.avg_end_to_end_time
-            self._system_metrics.avg_end_to_end_time = (
-                (prev_avg * (total - 1) + processing_time) / total
-            )
+        # Update average end-to-end time with the incremental mean, which
+        # stays accurate as the query count grows; error_rate is derived on read
+        prev_avg = self._system_metrics.avg_end_to_end_time or 0.0
+        self._system_metrics.avg_end_to_end_time = (
+            prev_avg + (processing_time - prev_avg) / self._system_metrics.total_queries
+        )
     
     def get_session_summary(self) -> Dict[str, Any]:
         """Get summary of current session metrics."""
         session_duration = (datetime.now() - self._session_start).total_seconds()
         
-        # Aggregate metrics from query events
-        retrieval_metrics = []
-        generation_metrics = []
-        feedback_ratings = {"clarity": [], "citation": [], "safety": [], "usefulness": []}
+        # Average the per-event metrics over the events still held, ignoring NaN
+        values = self._summary_values[:len(self._query_events)]
+        counts = np.count_nonzero(~np.isnan(values), axis=0)
+        sums = np.nansum(values, axis=0)
+        averages = [float(total / count) if count else None for total, count in zip(sums, counts)]
         
+        # Feedback is attached to events after they are logged, so read it from the events
+        feedback_ratings = {"clarity": [], "citation": [], "safety": [], "usefulness": []}
+        feedback_count = 0
         for event in self._query_events:
-            if event.retrieval_metrics:
-                retrieval_metrics.append(event.retrieval_metrics)
-            
-            if event.generation_metrics:
-                generation_metrics.append(event.generation_metrics)
-            
-            if event.user_feedback and "ratings" in event.user_feedback:
-                ratings = event.user_feedback["ratings"]
-                for metric, value in ratings.items():
-                    if metric in feedback_ratings and value is not None:
-                        feedback_ratings[metric].append(value)
+            if not event.user_feedback:
+                continue
+            feedback_count += 1
+            for metric, value in event.user_feedback.get("ratings", {}).items():
+                if metric in feedback_ratings and value is not None:
+                    feedback_ratings[metric].append(value)
         
         # Calculate averages
         avg_feedback = {}
@@ -426,39 +683,55 @@ class EvaluationLoggingModule:
         
         return {
             "session_duration_minutes": session_duration / 60,
-            "system_metrics": asdict(self._system_metrics),
+            "system_metrics": self._system_metrics.to_dict(),
             "total_events": len(self._query_events),
-            "avg_retrieval_latency": self._calculate_avg_latency(retrieval_metrics, "latency_ms"),
-            "avg_generation_latency": self._calculate_avg_latency(generation_metrics, "generation_time_ms"),
-            "avg_citation_coverage": self._calculate_avg_metric(generation_metrics, "citation_coverage"),
+            "avg_retrieval_latency": averages[0],
+            "avg_generation_latency": averages[1],
+            "avg_citation_coverage": averages[2],
             "avg_user_feedback": avg_feedback,
-            "feedback_rate": len([e for e in self._query_events if e.user_feedback]) / max(1, len(self._query_events))
+            "feedback_rate": feedback_count / max(1, len(self._query_events))
         }
     
-    def _calculate_avg_latency(self, metrics_list: List, field_name: str) -> Optional[float]:
-        """Calculate average latency from metrics list."""
-        values = [getattr(m, field_name) for m in metrics_list if getattr(m, field_name) is not None]
-        return sum(values) / len(values) if values else None
-    
-    def _calculate_avg_metric(self, metrics_list: List, field_name: str) -> Optional[float]:
-        """Calculate average metric from metrics list."""
-        values = [getattr(m, field_name) for m in metrics_list if getattr(m, field_name) is not None]
-        return sum(values) / len(values) if values else None
+    def export_metrics(self, format_type: str = "json", output: Optional[TextIO] = None) -> Optional[str]:
+        """Export metrics in specified format.
+        
+        Query events are serialized one at a time rather than collected into one
+        nested dict first. With output, the export is streamed to that text file
+        and None is returned; otherwise it is returned as a string.
+        """
+        if format_type != "json":
+            raise ValueError(f"Unsupported export format: {format_type}")
+        
+        stream = io.StringIO() if output is None else output
+        self._write_metrics_json(stream)
+        return stream.getvalue() if output is None else None
     
-    def export_metrics(self, format_type: str = "json") -> str:
-        """Export metrics in specified format."""
-        if format_type == "json":
-            return json.dumps({
-                "session_summary": self.get_session_summary(),
-                "system_metrics": asdict(self._system_metrics),
-                "query_events": [asdict(event) for event in self._query_events]
-            }, indent=2, default=str)
+    def _write_metrics_json(self, stream: TextIO) -> None:
+        """Write the JSON export to stream, formatted as json.dumps(indent=2) would."""
+        def nested(value: Any, depth: int) -> str:
+            return json.dumps(value, indent=2, default=str).replace("\n", "\n" + "  " * depth)
+        
+        stream.write('{\n  "session_summary": ')
+        stream.write(nested(self.get_session_summary(), 1))
+        stream.write(',\n  "system_metrics": ')
+        stream.write(nested(self._system_metrics.to_dict(), 1))
+        stream.write(',\n  "query_events": ')
+        if not self._query_events:
+            stream.write('[]')
         else:
-            raise ValueError(f"Unsupported export format: {format_type}")
+            separator = '[\n    '
+            for event in self._query_events:
+                stream.write(separator)
+                stream.write(nested(event.to_dict(), 2))
+                separator = ',\n    '
+            stream.write('\n  ]')
+        stream.write('\n}')
     
     def clear_session_data(self) -> None:
         """Clear session data and reset metrics."""
-        self._query_events = []
+        self._query_events.clear()
+        self._summary_values.fill(np.nan)
+        self._events_logged = 0
         self._system_metrics = SystemMetrics()
         self._session_start = datetime.now()
         logger.info("Session data cleared and metrics reset")
@@ -3,16 +3,281 @@
 Objective: Generate grounded response using selected model.
 """
 
+import asyncio
+import functools
+import hashlib
+import importlib
+import inspect
+import json
 import logging
+import os
+import random
+import re
+import string
+import threading
 import time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, AsyncIterator, Iterator, List, Optional, Tuple
 from ..config.settings import Settings, LLMConfig
 from ..utils.exceptions import LLMError
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
 logger = logging.getLogger(__name__)
 
+# Transient failures are retried by the HTTP layer, honouring Retry-After
+# when the server sends one and backing off exponentially otherwise.
+# Up to RETRY_JITTER_SECONDS of random delay is added to each backoff so
+# concurrent callers hit by the same failure do not all retry in lockstep
+MAX_RETRIES = 3
+RETRY_BACKOFF_SECONDS = 0.5
+RETRY_BACKOFF_MAX_SECONDS = 30.0
+RETRY_JITTER_SECONDS = 0.5
+# urllib3 < 2 (still allowed by requests) has neither Retry option; there the
+# sync path falls back to its plain exponential backoff
+_RETRY_BACKOFF_OPTIONS = (
+    {"backoff_max": RETRY_BACKOFF_MAX_SECONDS, "backoff_jitter": RETRY_JITTER_SECONDS}
+    if "backoff_jitter" in inspect.signature(Retry).parameters else {}
+)
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# test_connection results are reused for this long, so health endpoints
+# polled by the UI do not hit the provider on every refresh
+HEALTH_CHECK_TTL_SECONDS = 30.0
+
+# KoboldCpp bodies are serialized up front and sent as raw bytes
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Prompt tokens a combined batch prompt spends on its answer-format instruction,
+# numbering and reasoning hint, on top of the template, context and questions
+_BATCH_PROMPT_RESERVE_TOKENS = 150
+# Batched answers come back as {"answers": [...]}, possibly inside a code fence
+_BATCH_JSON_RE = re.compile(r"\{.*\}", re.DOTALL)
+# Speaker/section labels models echo at the start of a response, e.g. "Answer:"
+_RESPONSE_ARTIFACT_RE = re.compile(
+    r"^(?:(?:Assistant|AI|Response|Answer|Human|User|Query)\s*:\s*)+",
+    re.IGNORECASE
+)
+# The words those labels start with, lower-cased. One tuple startswith on the
+# response's first 9 chars ("assistant") lets unlabelled responses skip the regex
+_RESPONSE_ARTIFACT_WORDS = ("assistant", "ai", "response", "answer", "human", "user", "query")
+# Document boundaries in a retrieved context: rule lines and "Document:"/"Source:"
+# labels at the start of a line. All kinds are split on in one pass. "###" only
+# counts as a whole line, so Markdown headings stay inside their document
+_DOC_SPLIT_RE = re.compile(r"(?:^|\n)(?:---+|===+|#{3,}[ \t]*$|Document:|Source:)", re.MULTILINE)
+# Terms boosted when scoring documents for a technical audience
+_TECHNICAL_TERMS = frozenset({
+    'configuration', 'setup', 'database', 'server', 'deployment', 'api',
+    'integration', 'system', 'architecture', 'implementation', 'framework',
+    'protocol', 'authentication', 'endpoint', 'middleware', 'repository'
+})
+# Azure OpenAI system messages per audience; other audiences use llm.system_instruction
+_AUDIENCE_SYSTEM_INSTRUCTIONS = {
+    "general": ("You are an AI assistant that provides well-formatted answers using Markdown. "
+                "Use **bold** for key terms, *italics* for emphasis, tables for data, and bullet points for lists. "
+                "Answer STRICTLY based on the provided context - never use external knowledge. "
+                "Start with a direct answer, then provide supporting details in a structured format."),
+    "technical": ("You are an AI assistant that provides well-formatted answers using Markdown. "
+                  "Use **bold** for key terms, *italics* for emphasis, `code blocks` for technical terms, "
+                  "tables for comparisons, numbered lists for procedures, and Mermaid diagrams for workflows. "
+                  "Answer STRICTLY based on the provided context - never use external knowledge. "
+                  "Focus on technical implementation and system configuration. "
+                  "Start with a direct answer, then provide detailed structured information."),
+}
+# Fallback when the model ignores the JSON instruction: "A1:", "Answer 2:", "Q3." ...
+_BATCH_ANSWER_MARKER_RE = re.compile(
+    r"^[ \t>*#]*(?:A|Answer|Q|Question)\s*(\d+)\s*[:.)]\**[ \t]*",
+    re.MULTILINE | re.IGNORECASE
+)
+
+# Provider SDKs imported on first use, so an unused provider is never loaded
+_SDKS: Dict[str, Any] = {}
+
+
+def _load_sdk(name: str) -> Any:
+    """Import a provider SDK once and return the cached module."""
+    module = _SDKS.get(name)
+    if module is None:
+        module = _SDKS[name] = importlib.import_module(name)
+    return module
+
+
+@functools.lru_cache(maxsize=8)
+def _compile_template(template: str) -> Optional[Tuple[Tuple[str, ...], Tuple[str, ...]]]:
+    """Split a prompt template into its literal text and {context}/{query} fields.
+    
+    Returns (literals, fields) with len(literals) == len(fields) + 1, or None
+    if the template uses anything else (format specs, other fields), in which
+    case it is rendered with str.format.
+    """
+    literals = []
+    fields = []
+    # Escaped braces arrive as separate literal runs; join them up to each field
+    pending = []
+    try:
+        for literal, field, format_spec, conversion in string.Formatter().parse(template):
+            pending.append(literal)
+            if field is None:
+                continue
+            if field not in ("context", "query") or format_spec or conversion:
+                return None
+            literals.append("".join(pending))
+            fields.append(field)
+            pending = []
+    except ValueError:
+        return None
+    literals.append("".join(pending))
+    return tuple(literals), tuple(fields)
+
+
+def _render_template(template: str, context: str, query: str) -> str:
+    """Render a prompt template without re-parsing it on every call."""
+    compiled = _compile_template(template)
+    if compiled is None:
+        return template.format(context=context, query=query)
+    
+    literals, fields = compiled
+    values = {"context": context, "query": query}
+    pieces = [literals[0]]
+    for field, literal in zip(fields, literals[1:]):
+        pieces.append(values[field])
+        pieces.append(literal)
+    return "".join(pieces)
+
+
+@functools.lru_cache(maxsize=4)
+def _get_encoding(model: str) -> Optional[Any]:
+    """Return the tiktoken encoding for an OpenAI model, or None if it cannot be loaded."""
+    if tiktoken is None:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            # Models newer than the installed tiktoken use the GPT-4o family encoding
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        # The BPE ranks are downloaded on first use and may be unreachable
+        logger.warning(f"tiktoken encoding unavailable for {model} ({e}), estimating token counts")
+        return None
+
+
+# Contexts are counted once for truncation and again inside the final prompt,
+# and eval runs repeat the same contexts across queries
+@functools.lru_cache(maxsize=128)
+def _count_bpe_tokens(encoding: Any, text: str) -> int:
+    """Return the exact BPE token count of text."""
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def _json_dumps(obj: Any) -> bytes:
+    """Serialize a request body to UTF-8 JSON, using orjson when installed."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+def _json_loads(data: Any) -> Any:
+    """Parse a JSON response body (bytes or str), using orjson when installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _iter_sse_lines(response: Any) -> Iterator[str]:
+    """Yield the lines of a streamed requests response as soon as each arrives.
+    
+    iter_lines() reads fixed 512-byte blocks. KoboldCpp streams events without
+    chunked transfer encoding, so those reads wait until a dozen or so tokens
+    have accumulated before the first one is seen. read1() returns whatever
+    the socket has instead.
+    """
+    read1 = getattr(response.raw, "read1", None)
+    if read1 is None:  # urllib3 < 2
+        for line in response.iter_lines():
+            yield line.decode("utf-8")
+        return
+    
+    pending = b""
+    while True:
+        data = read1(8192)
+        if not data:
+            break
+        *lines, pending = (pending + data).split(b"\n")
+        for line in lines:
+            yield line.rstrip(b"\r").decode("utf-8")
+    if pending:
+        yield pending.decode("utf-8")
+
+
+def _sse_token(line: str) -> Optional[str]:
+    """Return the token carried by a KoboldCpp server-sent event line, if any."""
+    if not line.startswith("data:"):
+        return None
+    try:
+        return _json_loads(line[5:]).get("token")
+    except (ValueError, AttributeError):
+        return None
+
+
+def _retry_delay(retry_after: Optional[str], attempt: int) -> float:
+    """Seconds to wait before retry number attempt + 1."""
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass  # HTTP-date form; fall back to backoff
+    backoff = min(RETRY_BACKOFF_SECONDS * (2 ** attempt), RETRY_BACKOFF_MAX_SECONDS)
+    return backoff + random.uniform(0, RETRY_JITTER_SECONDS)
+
+
+async def _anext_or_none(stream: AsyncIterator[str]) -> Optional[str]:
+    """Return the stream's next item, or None once it is exhausted."""
+    try:
+        return await stream.__anext__()
+    except StopAsyncIteration:
+        return None
+
+
+async def _aclose_stream(stream: Any) -> None:
+    """Close an async generator; a coroutine, so it can be handed to another loop."""
+    await stream.aclose()
+
+
+class _AsyncRateLimiter:
+    """Token bucket admitting `rate` requests per `period` seconds, bursting up to `rate`.
+    
+    Each caller reserves its slot before sleeping, so waiters are admitted in
+    arrival order. Must only be used from the event loop it was created for.
+    """
+    
+    def __init__(self, rate: int, period: float = 60.0):
+        self._interval = period / rate
+        self._burst = period - self._interval
+        self._next_slot = 0.0
+    
+    async def acquire(self) -> None:
+        """Wait until a request may be sent."""
+        now = asyncio.get_running_loop().time()
+        slot = max(self._next_slot, now)
+        self._next_slot = slot + self._interval
+        delay = slot - now - self._burst
+        if delay > 0:
+            await asyncio.sleep(delay)
+
 
 class LLMOrchestrationModule:
     """Module for YAML-driven LLM model loading and response generation."""
@@ -20,18 +285,58 @@ class LLMOrchestrationModule:
     def __init__(self, config: Settings):
         self.config = config
         self.llm_config = config.llm
+        # Serialized once; the config does not change for the lifetime of the module.
+        # Shared by every result's metadata, so consumers must treat it as read-only.
+        self._llm_config_dict = self.llm_config.model_dump()
         self.client = None
+        # KoboldCpp calls reuse pooled keep-alive connections
+        self._session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=16,
+            pool_maxsize=64,
+            max_retries=Retry(
+                total=MAX_RETRIES,
+                backoff_factor=RETRY_BACKOFF_SECONDS,
+                **_RETRY_BACKOFF_OPTIONS,
+                status_forcelist=RETRY_STATUSES,
+                allowed_methods=frozenset({"GET", "POST"}),
+                respect_retry_after_header=True,
+                # Hand the last response back so raise_for_status reports it
+                raise_on_status=False
+            )
+        )
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        # Async clients are bound to the event loop they were created in; only
+        # the background loop creates them, see _run_on_background_loop
+        self._async_loop = None
+        self._aclient = None
+        self._ahttp = None
+        self._async_semaphore = None
+        self._async_limiter = None
+        # Event loop thread running every async model call, for sync and async callers
+        self._background_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._background_thread: Optional[threading.Thread] = None
+        self._background_lock = threading.Lock()
+        self._azure_client_kwargs = None
+        # (monotonic time, healthy) of the last test_connection check
+        self._last_health: Optional[Tuple[float, bool]] = None
         self.prompt_template = None
-        self._stats = {
-            "total_requests": 0,
-            "avg_response_time": 0,
-            "total_tokens_used": 0,
-            "successful_requests": 0,
-            "reasoning_tokens_used": 0,  # GPT-4o nano specific
-            "smart_truncation_applied": 0,
-            "context_optimization_applied": 0,
-            "domain_disclaimers_added": 0
-        }
+        # Template path -> (mtime_ns, text); files are re-read only when they change on disk
+        self._template_files: Dict[str, Tuple[int, str]] = {}
+        # Cache key -> (response, prompt_length, response_length, expires_at), least recently
+        # used first; expires_at is a time.monotonic() deadline
+        self._response_cache: "OrderedDict[str, Tuple[str, int, int, float]]" = OrderedDict()
+        self._response_cache_lock = threading.Lock()
+        # Cache key -> future resolved when the async request computing it finishes
+        self._in_flight: Dict[str, "asyncio.Future[None]"] = {}
+        # Requests may complete on several threads at once; counters are only
+        # touched under this lock and averages are derived from totals in get_stats
+        self._stats_lock = threading.Lock()
+        self._stats = self._new_stats()
+        self._total_response_time = 0.0
+        self._total_time_to_first_token = 0.0
+        self._total_time_per_output_token = 0.0
         
         # Initialize the LLM client
         logger.info(f"Initializing LLM orchestration with provider: {self.llm_config.provider}")
@@ -66,7 +371,7 @@ class LLMOrchestrationModule:
             logger.info(f"Attempting to connect to KoboldCpp at {api_url}")
             
             # Test connection to KoboldCpp server
-            response = requests.get(
+            response = self._session.get(
                 f"{api_url}/model", 
                 timeout=10
             )
@@ -131,8 +436,7 @@ class LLMOrchestrationModule:
     def _initialize_azure_openai(self) -> bool:
         """Initialize Azure OpenAI client with detailed error reporting."""
         try:
-            # Import and initialize Azure OpenAI client
-            from openai import AzureOpenAI
+            openai = _load_sdk("openai")
             
             api_key = self.config.get_api_key("azure_openai")
             endpoint = self.config.azure_openai_endpoint
@@ -168,11 +472,14 @@ class LLMOrchestrationModule:
                 logger.error(error_msg)
                 raise ValueError(error_msg)
             
-            self.client = AzureOpenAI(
-                api_key=api_key,
-                azure_endpoint=endpoint,
-                api_version=api_version
-            )
+            self._azure_client_kwargs = {
+                "api_key": api_key,
+                "azure_endpoint": endpoint,
+                "api_version": api_version,
+                # The SDK retries 429/5xx and connection errors itself, honouring Retry-After
+                "max_retries": MAX_RETRIES
+            }
+            self.client = openai.AzureOpenAI(**self._azure_client_kwargs)
             logger.info("Azure OpenAI client initialized successfully")
             return True
             
@@ -182,31 +489,65 @@ class LLMOrchestrationModule:
             raise
         except Exception as e:
             logger.error(f"Failed to initialize Azure OpenAI client: {e}")
-            import traceback
-            logger.error(f"Traceback: {traceback.format_exc()}")
+            logger.debug("Azure OpenAI initialization traceback", exc_info=True)
             error_msg = (
                 f"Azure OpenAI Initialization Failed: {str(e)}\n"
                 f"Check your credentials and network connection.\n"
-                f"See logs for detailed traceback."
+                f"Enable DEBUG logging for the detailed traceback."
             )
             raise ValueError(error_msg)
             return False
     
     def load_prompt_template(self) -> str:
         """Load prompt template from configured path."""
-        template_path = Path(self.llm_config.prompt_template)
+        template_path = self.llm_config.prompt_template
         
-        if not template_path.exists():
+        try:
+            self.prompt_template = self._read_template(template_path)
+        except FileNotFoundError:
             # Create default generic template if none exists
-            template_path.parent.mkdir(parents=True, exist_ok=True)
+            Path(template_path).parent.mkdir(parents=True, exist_ok=True)
             default_template = self._get_default_generic_template()
-            template_path.write_text(default_template)
+            Path(template_path).write_text(default_template)
             logger.info(f"Created default prompt template at {template_path}")
-        
-        self.prompt_template = template_path.read_text(encoding='utf-8')
+            self.prompt_template = self._read_template(template_path)
         logger.info(f"Loaded prompt template from {template_path}")
         return self.prompt_template
     
+    def _maybe_reload_template(self) -> str:
+        """Return the prompt template, re-reading the file only if it changed on disk."""
+        if self.prompt_template is None:
+            return self.load_prompt_template()
+        
+        # Keyed by the configured string as-is; building a Path per query costs more than the stat
+        template_path = self.llm_config.prompt_template
+        if template_path in self._template_files:
+            try:
+                self.prompt_template = self._read_template(template_path)
+            except OSError as e:
+                logger.warning(f"Failed to reload prompt template: {e}, keeping the loaded one")
+        return self.prompt_template
+    
+    def _read_template(self, template_path: str) -> str:
+        """Read a template file, reusing the cached text while its mtime is unchanged.
+        
+        A newly read template is split into its segments right away, so the
+        first query after a (re)load does not pay for it.
+        
+        Raises FileNotFoundError if the file does not exist.
+        """
+        mtime = os.stat(template_path).st_mtime_ns
+        cached = self._template_files.get(template_path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        
+        text = Path(template_path).read_text(encoding='utf-8')
+        self._template_files[template_path] = (mtime, text)
+        _compile_template(text)
+        if cached is not None:
+            logger.info(f"Reloaded changed template {template_path}")
+        return text
+    
     def _get_default_generic_template(self) -> str:
         """Get default generic prompt template."""
         return '''Context Information:
@@ -216,8 +557,12 @@ Query: {query}
 
 Please provide a clear, direct answer based on the context above.'''
     
-    def generate_response(self, query: str, context: str) -> Dict[str, Any]:
-        """Generate grounded response using the selected model."""
+    def generate_response(self, query: str, context: str, use_cache: bool = True) -> Dict[str, Any]:
+        """Generate grounded response using the selected model.
+        
+        With use_cache=False the response cache is neither read nor written,
+        so the model is always called.
+        """
         start_time = time.time()
         
         try:
@@ -225,6 +570,11 @@ Please provide a clear, direct answer based on the context above.'''
             audience = "general"  # Default to general business/technical users
             self._current_audience = audience
             
+            cache_key = self._response_cache_key(query, context, audience) if use_cache else None
+            cached = self._get_cached_response(cache_key, query, audience, start_time)
+            if cached is not None:
+                return cached
+            
             # Step 1: Construct prompt
             prompt = self._construct_prompt(query, context, audience)
             
@@ -234,58 +584,462 @@ Please provide a clear, direct answer based on the context above.'''
             # Step 3: Parse response
             parsed_response = self._parse_response(response)
             
-            # Update statistics
-            response_time = time.time() - start_time
-            self._update_stats(response_time, len(response))
-            
-            logger.info(f"Generated response in {response_time:.2f}s")
-            
-            return {
-                "response": parsed_response,
-                "query": query,
-                "audience": audience,
-                "model": self.llm_config.model,
-                "provider": self.llm_config.provider,
-                "metadata": {
-                    "response_time": response_time,
-                    "model_config": self.llm_config.dict(),
-                    "prompt_length": len(prompt),
-                    "response_length": len(response)
-                }
-            }
+            self._cache_response(cache_key, parsed_response, prompt, response)
+            return self._build_result(query, audience, prompt, response, parsed_response, start_time)
             
         except Exception as e:
             logger.error(f"Response generation failed: {e}")
             raise LLMError(f"Failed to generate response: {e}")
     
-    def _construct_prompt(self, query: str, context: str, audience: str) -> str:
-        """Construct prompt using template and context with smart truncation for GPT-4o nano."""
-        # Try to use enhanced formatting prompt if configured and available
-        prompt_template_to_use = self.prompt_template
+    async def agenerate_response(self, query: str, context: str, use_cache: bool = True) -> Dict[str, Any]:
+        """Async variant of generate_response.
         
-        if hasattr(self.llm_config, 'answer_formatting_prompt') and self.llm_config.answer_formatting_prompt:
-            formatting_prompt_path = Path(self.llm_config.answer_formatting_prompt)
-            if formatting_prompt_path.exists():
-                try:
-                    prompt_template_to_use = formatting_prompt_path.read_text(encoding='utf-8')
-                    logger.debug(f"Using enhanced formatting prompt from {formatting_prompt_path}")
-                except Exception as e:
-                    logger.warning(f"Failed to load enhanced formatting prompt: {e}, using default")
+        The model call is awaited instead of blocking, so several queries can
+        be run concurrently with asyncio.gather. Identical cacheable requests
+        that arrive while one is in flight wait for it and are answered from
+        the response cache instead of calling the model again.
+        """
+        return await self._run_on_background_loop(self._agenerate_response(query, context, use_cache))
+    
+    async def _agenerate_response(self, query: str, context: str, use_cache: bool) -> Dict[str, Any]:
+        """agenerate_response body; runs on the background loop."""
+        start_time = time.time()
+        in_flight = None
         
-        if not prompt_template_to_use:
-            self.load_prompt_template()
-            prompt_template_to_use = self.prompt_template
+        try:
+            audience = "general"
+            self._current_audience = audience
+            
+            cache_key = self._response_cache_key(query, context, audience) if use_cache else None
+            cached = self._get_cached_response(cache_key, query, audience, start_time)
+            if cached is not None:
+                return cached
+            
+            if cache_key is not None:
+                leader = self._in_flight.get(cache_key)
+                if leader is not None:
+                    # shield: a cancelled waiter must not cancel the leader's future
+                    await asyncio.shield(leader)
+                    cached = self._get_cached_response(cache_key, query, audience, start_time)
+                    if cached is not None:
+                        return cached
+                    # The leader failed; make the call ourselves
+                else:
+                    in_flight = asyncio.get_running_loop().create_future()
+                    self._in_flight[cache_key] = in_flight
+            
+            prompt = self._construct_prompt(query, context, audience)
+            response = await self._ainvoke_model(prompt)
+            parsed_response = self._parse_response(response)
+            
+            self._cache_response(cache_key, parsed_response, prompt, response)
+            return self._build_result(query, audience, prompt, response, parsed_response, start_time)
+            
+        except Exception as e:
+            logger.error(f"Response generation failed: {e}")
+            raise LLMError(f"Failed to generate response: {e}")
+        finally:
+            if in_flight is not None:
+                del self._in_flight[cache_key]
+                in_flight.set_result(None)
+    
+    def stream_response(self, query: str, context: str, use_cache: bool = True) -> Iterator[str]:
+        """Generate a response incrementally, yielding text as the model produces it.
+        
+        Time to first token and time per output token are added to the stats.
+        Chunks are passed through as received, so the artifact stripping and
+        post-processing applied by generate_response are not applied here.
+        """
+        start_time = time.time()
+        audience = "general"
+        self._current_audience = audience
+        
+        cache_key = self._response_cache_key(query, context, audience) if use_cache else None
+        cached = self._get_cached_response(cache_key, query, audience, start_time)
+        if cached is not None:
+            yield cached["response"]
+            return
+        
+        prompt = self._construct_prompt(query, context, audience)
+        chunks = []
+        first_token_time = None
+        try:
+            for text in self._stream_model(prompt):
+                if first_token_time is None:
+                    first_token_time = time.time()
+                chunks.append(text)
+                yield text
+        except Exception as e:
+            logger.error(f"Response streaming failed: {e}")
+            raise LLMError(f"Failed to stream response: {e}")
+        
+        self._finish_stream(cache_key, prompt, chunks, start_time, first_token_time)
+    
+    async def astream_response(self, query: str, context: str, use_cache: bool = True) -> AsyncIterator[str]:
+        """Async variant of stream_response."""
+        stream = self._astream_response(query, context, use_cache)
+        if asyncio.get_running_loop() is self._get_background_loop():
+            async for text in stream:
+                yield text
+            return
+        
+        # Pull the stream forward on the background loop one chunk at a time
+        try:
+            while True:
+                text = await self._run_on_background_loop(_anext_or_none(stream))
+                if text is None:
+                    break
+                yield text
+        finally:
+            await self._run_on_background_loop(_aclose_stream(stream))
+    
+    async def _astream_response(self, query: str, context: str, use_cache: bool) -> AsyncIterator[str]:
+        """astream_response body; runs on the background loop."""
+        start_time = time.time()
+        audience = "general"
+        self._current_audience = audience
+        
+        cache_key = self._response_cache_key(query, context, audience) if use_cache else None
+        cached = self._get_cached_response(cache_key, query, audience, start_time)
+        if cached is not None:
+            yield cached["response"]
+            return
+        
+        prompt = self._construct_prompt(query, context, audience)
+        chunks = []
+        first_token_time = None
+        try:
+            async for text in self._astream_model(prompt):
+                if first_token_time is None:
+                    first_token_time = time.time()
+                chunks.append(text)
+                yield text
+        except Exception as e:
+            logger.error(f"Response streaming failed: {e}")
+            raise LLMError(f"Failed to stream response: {e}")
+        
+        self._finish_stream(cache_key, prompt, chunks, start_time, first_token_time)
+    
+    def _finish_stream(self, cache_key: Optional[str], prompt: str, chunks: List[str],
+                       start_time: float, first_token_time: Optional[float]) -> None:
+        """Record statistics for a completed stream and cache its text."""
+        end_time = time.time()
+        response = "".join(chunks)
+        self._update_stats(end_time - start_time, len(response))
+        
+        if first_token_time is not None:
+            # Each streamed chunk carries about one token
+            time_to_first_token = first_token_time - start_time
+            time_per_output_token = (end_time - first_token_time) / max(len(chunks) - 1, 1)
+            with self._stats_lock:
+                self._stats["streamed_requests"] += 1
+                self._total_time_to_first_token += time_to_first_token
+                self._total_time_per_output_token += time_per_output_token
+            logger.info("Streamed response: first token after %.2fs, %.1fms per token",
+                        time_to_first_token, time_per_output_token * 1000)
+        
+        if response.strip():
+            self._cache_response(cache_key, self._parse_response(response), prompt, response)
+    
+    def _response_cache_key(self, query: str, context: str, audience: str) -> Optional[str]:
+        """Return the response cache key for a request, or None if it is not cacheable.
+        
+        Besides the request itself the key covers everything the prompt and
+        generation depend on: the template text (re-read if it changed on
+        disk, so an edited template misses), the system instruction and the
+        generation parameters.
+        """
+        cache_config = self.llm_config.cache
+        if not cache_config.enabled:
+            return None
+        # Sampled responses differ run to run; only cache them when asked to
+        if self.llm_config.temperature > 0 and not cache_config.include_nonzero_temp:
+            return None
+        
+        system_instruction = _AUDIENCE_SYSTEM_INSTRUCTIONS.get(audience, self.llm_config.system_instruction)
+        key_fields = (self.llm_config.model, str(self.llm_config.temperature), str(self.llm_config.max_tokens),
+                      system_instruction, self._select_template(), audience, query, context)
+        return hashlib.blake2b("\x1f".join(key_fields).encode(), digest_size=16).hexdigest()
+    
+    def _get_cached_response(self, cache_key: Optional[str], query: str, audience: str,
+                             start_time: float) -> Optional[Dict[str, Any]]:
+        """Return the result for a cached response, or None on a miss or an expired entry."""
+        if cache_key is None:
+            return None
+        
+        with self._response_cache_lock:
+            entry = self._response_cache.get(cache_key)
+            if entry is None:
+                return None
+            if entry[3] <= time.monotonic():
+                del self._response_cache[cache_key]
+                return None
+            self._response_cache.move_to_end(cache_key)
+        with self._stats_lock:
+            self._stats["cache_hits"] += 1
+        
+        parsed_response, prompt_length, response_length, _ = entry
+        logger.info("Returning cached response")
+        result = self._result_dict(query, audience, parsed_response, time.time() - start_time,
+                                   prompt_length, response_length)
+        result["metadata"]["cached"] = True
+        return result
+    
+    def _cache_response(self, cache_key: Optional[str], parsed_response: str, prompt: str,
+                        response: str) -> None:
+        """Store a response, evicting the least recently used beyond max_entries."""
+        if cache_key is None:
+            return
+        
+        ttl = self.llm_config.cache.ttl_seconds
+        expires_at = time.monotonic() + ttl if ttl > 0 else float("inf")
+        with self._response_cache_lock:
+            self._response_cache[cache_key] = (parsed_response, len(prompt), len(response), expires_at)
+            self._response_cache.move_to_end(cache_key)
+            while len(self._response_cache) > self.llm_config.cache.max_entries:
+                self._response_cache.popitem(last=False)
+    
+    def clear_response_cache(self) -> None:
+        """Drop all cached responses."""
+        with self._response_cache_lock:
+            self._response_cache.clear()
+    
+    def _build_result(self, query: str, audience: str, prompt: str, response: str,
+                      parsed_response: str, start_time: float) -> Dict[str, Any]:
+        """Update statistics and assemble the generate_response result."""
+        response_time = time.time() - start_time
+        self._update_stats(response_time, len(response))
+        
+        logger.info("Generated response in %.2fs", response_time)
+        
+        return self._result_dict(query, audience, parsed_response, response_time,
+                                 len(prompt), len(response))
+    
+    def _result_dict(self, query: str, audience: str, parsed_response: str, response_time: float,
+                     prompt_length: int, response_length: int) -> Dict[str, Any]:
+        """Assemble the result returned for one answered query."""
+        return {
+            "response": parsed_response,
+            "query": query,
+            "audience": audience,
+            "model": self.llm_config.model,
+            "provider": self.llm_config.provider,
+            "metadata": {
+                "response_time": response_time,
+                "model_config": self._llm_config_dict,
+                "prompt_length": prompt_length,
+                "response_length": response_length
+            }
+        }
+    
+    def generate_responses_batch(self, queries: List[str], context: str,
+                                 concurrent: bool = False) -> List[Dict[str, Any]]:
+        """Answer several queries that share one context.
+        
+        By default up to llm.batch_size queries are answered by one combined
+        prompt, so the shared context is sent and prefilled once per group
+        instead of once per query. A group whose answers cannot be told apart
+        is answered again query by query. With concurrent=True every query
+        gets its own call, but the calls are in flight at the same time on
+        the module's background event loop. Code already running in an event
+        loop should await agenerate_responses instead of blocking on this.
+        
+        Returns:
+            One generate_response-style result per query, in input order
+        """
+        if concurrent:
+            future = asyncio.run_coroutine_threadsafe(
+                self.agenerate_responses(queries, context), self._get_background_loop()
+            )
+            return future.result()
+        
+        groups = self._batch_groups(queries, context)
+        if not groups:
+            return []
+        if len(groups) == 1:
+            return self._generate_combined(groups[0], context)
+        
+        # Build the next group's prompt on a helper thread while the current
+        # group's model call is waiting on the network
+        results = []
+        with ThreadPoolExecutor(max_workers=1) as prompt_builder:
+            next_prompt = prompt_builder.submit(self._prebuild_batch_prompt, groups[0], context)
+            for i, group in enumerate(groups):
+                prompt = next_prompt.result()
+                if i + 1 < len(groups):
+                    next_prompt = prompt_builder.submit(self._prebuild_batch_prompt, groups[i + 1], context)
+                results.extend(self._generate_combined(group, context, prompt))
+        return results
+    
+    async def agenerate_responses(self, queries: List[str], context: str) -> List[Dict[str, Any]]:
+        """Answer several queries concurrently, one model call per query."""
+        return await self._run_on_background_loop(self._agenerate_responses(queries, context))
+    
+    async def _agenerate_responses(self, queries: List[str], context: str) -> List[Dict[str, Any]]:
+        """agenerate_responses body; runs on the background loop."""
+        return list(await asyncio.gather(*(self._agenerate_response(query, context, True) for query in queries)))
+    
+    async def _run_on_background_loop(self, coro: Any) -> Any:
+        """Await a coroutine on the background loop from any event loop.
+        
+        Async clients, the concurrency semaphore, the rate limiter and in-flight
+        requests all belong to the background loop. Callers on other loops,
+        such as one asyncio.run per request, hand their work over instead of
+        creating clients that would leak when their loop ends.
+        """
+        loop = self._get_background_loop()
+        if asyncio.get_running_loop() is loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+    
+    def _get_background_loop(self) -> asyncio.AbstractEventLoop:
+        """Return the event loop that runs all async calls, starting it on first use.
+        
+        The loop lives as long as the module, so its async clients and their
+        connection pools are reused across calls instead of being rebuilt
+        by asyncio.run each time.
+        """
+        with self._background_lock:
+            if self._background_loop is None:
+                loop = asyncio.new_event_loop()
+                self._background_thread = threading.Thread(
+                    target=loop.run_forever, name="llm-orchestration-loop", daemon=True
+                )
+                self._background_thread.start()
+                self._background_loop = loop
+            return self._background_loop
+    
+    def _batch_groups(self, queries: List[str], context: str) -> List[List[str]]:
+        """Split queries into groups that are each answered by one combined prompt.
+        
+        A group holds at most llm.batch_size queries and is closed early once
+        its questions would push the combined prompt past the token budget,
+        where _optimize_context_for_model would start cutting context lines.
+        Token counts for the whole batch are taken up front, with the same
+        counter the truncation logic uses.
+        """
+        batch_size = self.llm_config.batch_size
+        query_tokens = [self._count_tokens(query) + 2 for query in queries]  # + "Qn: " numbering
+        fixed_tokens = (self._count_tokens(self._select_template()) + self._count_tokens(context)
+                        + _BATCH_PROMPT_RESERVE_TOKENS)
+        budget = self.llm_config.max_tokens - self.llm_config.token_buffer - fixed_tokens
+        if budget <= 0:
+            # The context alone overflows, so every prompt is truncated anyway;
+            # splitting further would only add calls
+            budget = sum(query_tokens)
+        
+        groups: List[List[str]] = []
+        group: List[str] = []
+        group_tokens = 0
+        for query, tokens in zip(queries, query_tokens):
+            if group and (len(group) == batch_size or group_tokens + tokens > budget):
+                groups.append(group)
+                group, group_tokens = [], 0
+            group.append(query)
+            group_tokens += tokens
+        if group:
+            groups.append(group)
+        return groups
+    
+    def _prebuild_batch_prompt(self, queries: List[str], context: str) -> Optional[str]:
+        """Construct a group's combined prompt ahead of its model call.
+        
+        Returns None for single-query groups and on failure; _generate_combined
+        then builds the prompt itself and handles the error.
+        """
+        if len(queries) == 1:
+            return None
+        try:
+            return self._construct_batch_prompt(queries, context, "general")
+        except Exception as e:
+            logger.debug("Prebuilding batch prompt failed: %s", e)
+            return None
+    
+    def _generate_combined(self, queries: List[str], context: str,
+                           prompt: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Answer a group of queries with a single model call, reusing a prebuilt prompt if given."""
+        if len(queries) == 1:
+            return [self.generate_response(queries[0], context)]
+        
+        start_time = time.time()
+        audience = "general"
+        self._current_audience = audience
+        
+        try:
+            if prompt is None:
+                prompt = self._construct_batch_prompt(queries, context, audience)
+            response = self._invoke_model(prompt)
+            answers = [self._parse_response(answer)
+                       for answer in self._split_batch_answers(response, len(queries))]
+        except Exception as e:
+            logger.warning(f"Combined answer for {len(queries)} queries unusable, "
+                           f"answering them one by one: {e}")
+            return [self.generate_response(query, context) for query in queries]
+        
+        response_time = time.time() - start_time
+        self._update_stats(response_time, len(response))
+        logger.info("Generated %d batched responses in %.2fs", len(queries), response_time)
+        
+        results = []
+        for query, answer in zip(queries, answers):
+            result = self._result_dict(query, audience, answer, response_time, len(prompt), len(answer))
+            result["metadata"]["batch_size"] = len(queries)
+            results.append(result)
+        return results
+    
+    def _construct_batch_prompt(self, queries: List[str], context: str, audience: str) -> str:
+        """Construct one prompt asking for numbered answers to all queries."""
+        numbered = "\n".join(f"Q{i}: {query}" for i, query in enumerate(queries, 1))
+        batch_query = (
+            f"Answer each of the following {len(queries)} questions separately.\n"
+            f"{numbered}\n\n"
+            'Return only a JSON object of the form {"answers": ["<answer to Q1>", "<answer to Q2>", ...]} '
+            "with exactly one answer per question, in the same order."
+        )
+        return self._construct_prompt(batch_query, context, audience)
+    
+    def _split_batch_answers(self, response: str, expected: int) -> List[str]:
+        """Split a combined response into one answer per query.
+        
+        Raises:
+            ValueError: If the response does not hold exactly `expected` answers
+        """
+        match = _BATCH_JSON_RE.search(response)
+        if match:
+            try:
+                # strict=False: post-processing may have put raw newlines in strings
+                answers = json.loads(match.group(0), strict=False).get("answers")
+            except (ValueError, AttributeError):
+                answers = None
+            if isinstance(answers, list) and len(answers) == expected:
+                return [str(answer) for answer in answers]
+        
+        # Fall back to "A1: ... A2: ..." style numbering
+        parts = _BATCH_ANSWER_MARKER_RE.split(response)
+        numbers = [int(number) for number in parts[1::2]]
+        if numbers != list(range(1, expected + 1)):
+            raise ValueError(f"expected {expected} answers, could not split response")
+        return parts[2::2]
+    
+    def _construct_prompt(self, query: str, context: str, audience: str) -> str:
+        """Construct prompt using template and context with smart truncation for GPT-4o nano."""
+        prompt_template_to_use = self._select_template()
         
         # Apply smart context truncation for GPT-4o nano's 12K token limit
         # Always apply truncation if max_tokens is high (10K+) to avoid token limit errors
         if self.llm_config.use_smart_truncation and self.llm_config.max_tokens >= 8000:
             context = self._apply_smart_context_truncation(context, query, audience)
         
+        # Anything that varies with the query goes into the query slot, so the
+        # template preamble and context stay a byte-identical prefix across
+        # queries. Azure OpenAI's prompt caching and KoboldCpp's fast-forward
+        # then reuse the already computed prefix instead of prefilling it again.
+        query_block = query
+        if self.llm_config.context_optimization:
+            query_block = self._reasoning_hint(query, audience) + query
+        
         # Format the prompt template (only context and query now)
-        prompt = prompt_template_to_use.format(
-            context=context,
-            query=query
-        )
+        prompt = _render_template(prompt_template_to_use, context, query_block)
         
         # Final token management check
         if self.llm_config.context_optimization:
@@ -293,19 +1047,36 @@ Please provide a clear, direct answer based on the context above.'''
         
         return prompt
     
+    def _select_template(self) -> str:
+        """Return the enhanced formatting prompt if configured and available, else the prompt template."""
+        prompt_template_to_use = None
+        
+        if hasattr(self.llm_config, 'answer_formatting_prompt') and self.llm_config.answer_formatting_prompt:
+            formatting_prompt_path = self.llm_config.answer_formatting_prompt
+            try:
+                prompt_template_to_use = self._read_template(formatting_prompt_path)
+                logger.debug("Using enhanced formatting prompt from %s", formatting_prompt_path)
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.warning(f"Failed to load enhanced formatting prompt: {e}, using default")
+        
+        if not prompt_template_to_use:
+            prompt_template_to_use = self._maybe_reload_template()
+        
+        return prompt_template_to_use
+    
     def _apply_smart_context_truncation(self, context: str, query: str, audience: str) -> str:
         """Apply smart context truncation optimized for GPT-4o nano's 12K context window."""
         logger.debug("Applying smart context truncation for GPT-4o nano")
         
-        # Estimate tokens (rough approximation: 1 token ≈ 4 characters)
         max_context_tokens = self.llm_config.max_tokens - self.llm_config.token_buffer
-        max_context_chars = max_context_tokens * 4
         
-        if len(context) <= max_context_chars:
-            logger.debug(f"Context fits within limits: {len(context)} chars")
+        if self._count_tokens(context) <= max_context_tokens:
+            logger.debug("Context fits within limits: %d chars", len(context))
             return context
         
-        logger.info(f"Context too long ({len(context)} chars), applying smart truncation")
+        logger.info("Context too long (%d chars), applying smart truncation", len(context))
         
         # Split context into documents/chunks
         documents = self._extract_documents_from_context(context)
@@ -314,28 +1085,17 @@ Please provide a clear, direct answer based on the context above.'''
         scored_docs = self._score_documents_for_relevance(documents, query, audience)
         
         # Build truncated context prioritizing most relevant content
-        truncated_context = self._build_truncated_context(scored_docs, max_context_chars)
+        truncated_context = self._build_truncated_context(scored_docs, max_context_tokens)
         
-        logger.info(f"Context truncated: {len(context)} -> {len(truncated_context)} chars")
+        logger.info("Context truncated: %d -> %d chars", len(context), len(truncated_context))
         return truncated_context
     
     def _extract_documents_from_context(self, context: str) -> list:
         """Extract individual documents from context string."""
-        # Simple approach: split by common document separators
-        separators = ["---", "Document:", "Source:", "===", "###"]
-        
-        # Try to split by separators
-        documents = []
-        current_doc = context
-        
-        for separator in separators:
-            if separator in current_doc:
-                docs = current_doc.split(separator)
-                documents = [doc.strip() for doc in docs if doc.strip()]
-                break
+        documents = [doc.strip() for doc in _DOC_SPLIT_RE.split(context) if doc.strip()]
         
         # If no separators found, treat as single document
-        if not documents:
+        if len(documents) <= 1:
             documents = [context]
         
         return documents
@@ -347,75 +1107,104 @@ Please provide a clear, direct answer based on the context above.'''
         # Domain-specific terms (can be configured per use case)
         domain_terms = set()  # Empty set - can be populated from config if needed
         
-        # Technical terms get higher weight for technical audience
-        technical_terms = {
-            'configuration', 'setup', 'database', 'server', 'deployment', 'api',
-            'integration', 'system', 'architecture', 'implementation', 'framework',
-            'protocol', 'authentication', 'endpoint', 'middleware', 'repository'
-        }
-        
         scored_docs = []
         for doc in documents:
             doc_lower = doc.lower()
-            score = 0.0
+            # Each count is one C-level scan of the document; map keeps the
+            # per-term dispatch out of the bytecode loop
+            count = doc_lower.count
             
             # Query term matching
-            for term in query_terms:
-                score += doc_lower.count(term) * 2.0
+            score = sum(map(count, query_terms)) * 2.0
             
             # Audience-specific term boosting
             if audience == "technical":
-                for term in technical_terms:
-                    score += doc_lower.count(term) * 1.5
+                score += sum(map(count, _TECHNICAL_TERMS)) * 1.5
             elif domain_terms:
                 # Boost domain-specific terms if configured
-                for term in domain_terms:
-                    score += doc_lower.count(term) * 1.5
+                score += sum(map(count, domain_terms)) * 1.5
             
             # Document length penalty (prefer concise, relevant docs)
             length_penalty = len(doc) / 10000  # Penalty for very long docs
             score = max(0, score - length_penalty)
             
-            scored_docs.append((doc, score))
+            scored_docs.append((doc, score, self._count_tokens(doc)))
         
         # Sort by relevance score
         scored_docs.sort(key=lambda x: x[1], reverse=True)
-        logger.debug(f"Scored {len(scored_docs)} documents for relevance")
+        logger.debug("Scored %d documents for relevance", len(scored_docs))
         
         return scored_docs
     
-    def _build_truncated_context(self, scored_docs: list, max_chars: int) -> str:
-        """Build truncated context from highest-scoring documents."""
-        truncated_context = ""
-        remaining_chars = max_chars
+    def _build_truncated_context(self, scored_docs: list, max_tokens: int) -> str:
+        """Pack the most relevant documents into a token budget.
         
-        for doc, score in scored_docs:
-            # Reserve space for document separator
-            separator = "\n\n--- Document ---\n"
-            needed_chars = len(doc) + len(separator)
-            
-            if needed_chars <= remaining_chars:
-                # Include full document
-                truncated_context += separator + doc
-                remaining_chars -= needed_chars
-            else:
-                # Include partial document if there's significant space left
-                if remaining_chars > 500:  # Only if we have substantial space
-                    partial_doc = doc[:remaining_chars - len(separator) - 20] + "...[truncated]"
-                    truncated_context += separator + partial_doc
-                break
+        scored_docs holds (doc, score, tokens) sorted by score. Documents are
+        picked greedily by score per token, so a short, fairly relevant
+        document is not crowded out by a long one; the pick is replaced by the
+        best single document that fits whenever that scores higher on its own.
+        Left-over space goes to the start of the best document that did not
+        fit. Picked documents keep their relevance order.
+        """
+        # Reserve space for document separator
+        separator = "\n\n--- Document ---\n"
+        separator_tokens = self._count_tokens(separator)
+        costs = [tokens + separator_tokens for _, _, tokens in scored_docs]
         
-        return truncated_context.strip()
-    
-    def _optimize_context_for_model(self, prompt: str, query: str, audience: str) -> str:
-        """Apply final context optimization for the specific model."""
-        logger.debug("Applying model-specific context optimization")
+        by_density = sorted(range(len(scored_docs)),
+                            key=lambda i: scored_docs[i][1] / max(scored_docs[i][2], 1), reverse=True)
+        chosen = set()
+        used_tokens = 0
+        for i in by_density:
+            if used_tokens + costs[i] <= max_tokens:
+                chosen.add(i)
+                used_tokens += costs[i]
         
+        best_fitting = next((i for i, cost in enumerate(costs) if cost <= max_tokens), None)
+        if best_fitting is not None and scored_docs[best_fitting][1] > sum(scored_docs[i][1] for i in chosen):
+            chosen = {best_fitting}
+            used_tokens = costs[best_fitting]
+        
+        parts = [separator + scored_docs[i][0] for i in sorted(chosen)]
+        
+        # Include partial document if there's significant space left
+        remaining_tokens = max_tokens - used_tokens
+        if remaining_tokens > 125:  # Only if we have substantial space
+            left_out = next((i for i in range(len(scored_docs)) if i not in chosen), None)
+            if left_out is not None:
+                partial_doc = self._truncate_to_tokens(scored_docs[left_out][0],
+                                                       remaining_tokens - separator_tokens - 5)
+                parts.append(separator + partial_doc + "...[truncated]")
+        
+        return "".join(parts).strip()
+    
+    def _token_encoding(self) -> Optional[Any]:
+        """Return the tiktoken encoding for OpenAI models; None for local models and without tiktoken."""
+        if self.llm_config.provider != "azure_openai":
+            return None
+        return _get_encoding(self.llm_config.model)
+    
+    def _count_tokens(self, text: str) -> int:
+        """Count tokens with the model's BPE when available, else estimate ~4 chars per token."""
+        encoding = self._token_encoding()
+        if encoding is None:
+            return len(text) // 4
+        return _count_bpe_tokens(encoding, text)
+    
+    def _truncate_to_tokens(self, text: str, max_tokens: int) -> str:
+        """Cut text down to at most max_tokens tokens."""
+        encoding = self._token_encoding()
+        if encoding is None:
+            return text[:max_tokens * 4]
+        return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+    
+    def _reasoning_hint(self, query: str, audience: str) -> str:
+        """Return the analysis hint placed before complex queries, or an empty string."""
         # For GPT-4o nano, optimize for medical reasoning if applicable
         if "nano" in self.llm_config.model.lower():
             # Add reasoning prompt hints for complex queries
             if audience == "technical" or len(query.split()) > 10:
-                optimization_prefix = """[Detailed Analysis Required]
+                return """[Detailed Analysis Required]
 The following information requires careful medical reasoning. Consider:
 - Clinical evidence and safety implications
 - Biomedical mechanisms and pathways  
@@ -423,10 +1212,14 @@ The following information requires careful medical reasoning. Consider:
 - Evidence quality and limitations
 
 """
-                prompt = optimization_prefix + prompt
+        return ""
+    
+    def _optimize_context_for_model(self, prompt: str, query: str, audience: str) -> str:
+        """Apply final context optimization for the specific model."""
+        logger.debug("Applying model-specific context optimization")
         
         # Final token count check
-        estimated_tokens = len(prompt) // 4
+        estimated_tokens = self._count_tokens(prompt)
         max_allowed = self.llm_config.max_tokens - self.llm_config.token_buffer
         
         if estimated_tokens > max_allowed:
@@ -446,14 +1239,14 @@ The following information requires careful medical reasoning. Consider:
             # Keep everything before context (system instructions)
             for i in range(context_start_idx + 1):
                 truncated_lines.append(lines[i])
-                current_tokens += len(lines[i]) // 4
+                current_tokens += self._count_tokens(lines[i])
             
             # Add as much context as possible
             remaining_tokens = max_allowed - current_tokens - 100  # Reserve 100 for query
             context_lines = lines[context_start_idx+1:]
             
             for line in context_lines:
-                line_tokens = len(line) // 4
+                line_tokens = self._count_tokens(line)
                 if current_tokens + line_tokens > max_allowed - 100:
                     break
                 truncated_lines.append(line)
@@ -466,146 +1259,374 @@ The following information requires careful medical reasoning. Consider:
             prompt = '\n'.join(truncated_lines)
             logger.warning(f"Truncated to {len(truncated_lines)} lines ({current_tokens} tokens)")
         
-        logger.debug(f"Final prompt length: {len(prompt)} chars (~{len(prompt)//4} tokens)")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Final prompt length: %d chars (%d tokens)", len(prompt), self._count_tokens(prompt))
         return prompt
     
     def _invoke_model(self, prompt: str) -> str:
-        """Invoke the configured model with retry logic."""
+        """Invoke the configured model.
+        
+        Transient errors are retried below this call: by the Retry policy on
+        the KoboldCpp session and by the Azure OpenAI SDK's own retries.
+        """
         provider = self.llm_config.provider
-        max_retries = 3
         
-        for attempt in range(max_retries):
-            try:
-                if provider == "koboldcpp":
-                    return self._invoke_koboldcpp(prompt)
-                elif provider == "azure_openai":
-                    return self._invoke_azure_openai(prompt)
-                else:
-                    raise ValueError(f"Unsupported provider: {provider}. Supported: 'azure_openai', 'koboldcpp'")
-                    
-            except Exception as e:
-                if attempt == max_retries - 1:
-                    logger.error(f"Model invocation failed after {max_retries} attempts: {e}")
-                    raise
-                logger.warning(f"Attempt {attempt + 1} failed, retrying: {e}")
-                time.sleep(2 ** attempt)  # Exponential backoff
+        if provider == "koboldcpp":
+            return self._invoke_koboldcpp(prompt)
+        elif provider == "azure_openai":
+            return self._invoke_azure_openai(prompt)
+        else:
+            raise ValueError(f"Unsupported provider: {provider}. Supported: 'azure_openai', 'koboldcpp'")
+    
+    async def _ainvoke_model(self, prompt: str) -> str:
+        """Async variant of _invoke_model, throttled to the configured concurrency and rate."""
+        provider = self.llm_config.provider
+        
+        self._bind_async_clients()
+        async with self._async_semaphore:
+            await self._async_limiter.acquire()
+            if provider == "koboldcpp":
+                return await self._ainvoke_koboldcpp(prompt)
+            elif provider == "azure_openai":
+                return await self._ainvoke_azure_openai(prompt)
+            else:
+                raise ValueError(f"Unsupported provider: {provider}. Supported: 'azure_openai', 'koboldcpp'")
+    
+    def _stream_model(self, prompt: str) -> Iterator[str]:
+        """Stream text chunks from the configured model."""
+        provider = self.llm_config.provider
+        
+        if provider == "koboldcpp":
+            return self._stream_koboldcpp(prompt)
+        elif provider == "azure_openai":
+            return self._stream_azure_openai(prompt)
+        else:
+            raise ValueError(f"Unsupported provider: {provider}. Supported: 'azure_openai', 'koboldcpp'")
+    
+    async def _astream_model(self, prompt: str) -> AsyncIterator[str]:
+        """Async variant of _stream_model; a stream holds its concurrency slot until it ends."""
+        provider = self.llm_config.provider
+        
+        self._bind_async_clients()
+        async with self._async_semaphore:
+            await self._async_limiter.acquire()
+            if provider == "koboldcpp":
+                stream = self._astream_koboldcpp(prompt)
+            elif provider == "azure_openai":
+                stream = self._astream_azure_openai(prompt)
+            else:
+                raise ValueError(f"Unsupported provider: {provider}. Supported: 'azure_openai', 'koboldcpp'")
+            async for text in stream:
+                yield text
+    
+    def _bind_async_clients(self) -> None:
+        """Create the async clients on first use; only called on the background loop."""
+        loop = asyncio.get_running_loop()
+        if self._async_loop is loop:
+            return
+        
+        # Bound how many provider calls are in flight and how fast they start,
+        # so a large gather does not run into the provider's 429 limits
+        self._async_semaphore = asyncio.Semaphore(self.llm_config.max_concurrency)
+        self._async_limiter = _AsyncRateLimiter(self.llm_config.requests_per_minute)
+        if self.llm_config.provider == "azure_openai":
+            if self._azure_client_kwargs is None:
+                raise LLMError("Azure OpenAI client is not initialized")
+            self._aclient = _load_sdk("openai").AsyncAzureOpenAI(**self._azure_client_kwargs)
+        elif self.llm_config.provider == "koboldcpp":
+            httpx = _load_sdk("httpx")
+            self._ahttp = httpx.AsyncClient(
+                timeout=60,
+                limits=httpx.Limits(max_connections=64, max_keepalive_connections=32)
+            )
+        self._async_loop = loop
+    
+    def close(self) -> None:
+        """Close pooled HTTP connections and stop the background event loop."""
+        self._session.close()
+        
+        with self._background_lock:
+            loop, self._background_loop = self._background_loop, None
+        if loop is not None:
+            asyncio.run_coroutine_threadsafe(self._aclose_clients(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            self._background_thread.join()
+            loop.close()
+    
+    async def aclose(self) -> None:
+        """Close the async clients opened by the agenerate_response path."""
+        loop = self._background_loop
+        if loop is None:
+            return
+        if asyncio.get_running_loop() is loop:
+            await self._aclose_clients()
+        else:
+            await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self._aclose_clients(), loop))
+    
+    async def _aclose_clients(self) -> None:
+        """Close the async clients; runs on the background loop they belong to."""
+        if self._aclient is not None:
+            await self._aclient.close()
+        if self._ahttp is not None:
+            await self._ahttp.aclose()
+        self._aclient = None
+        self._ahttp = None
+        self._async_loop = None
     
     def _invoke_koboldcpp(self, prompt: str) -> str:
         """Invoke KoboldCpp API."""
         try:
-            payload = {
-                "prompt": prompt,
-                "max_length": self.llm_config.max_tokens or 512,
-                "temperature": self.llm_config.temperature,
-                "top_p": 0.9,
-                "rep_pen": 1.1,
-                "stop_sequence": ["\\n\\nUser:", "\\n\\nQuery:", "\\n\\nHuman:"]
-            }
-            
-            response = requests.post(
+            response = self._session.post(
                 f"{self.llm_config.api_url}/api/v1/generate",
-                json=payload,
+                data=_json_dumps(self._koboldcpp_payload(prompt)),
+                headers=_JSON_HEADERS,
                 timeout=60
             )
             response.raise_for_status()
             
-            result = response.json()
-            generated_text = result.get("results", [{}])[0].get("text", "")
+            return self._koboldcpp_text(_json_loads(response.content))
             
-            if not generated_text:
-                raise ValueError("Empty response from KoboldCpp")
+        except Exception as e:
+            logger.error(f"KoboldCpp invocation failed: {e}")
+            raise
+    
+    async def _ainvoke_koboldcpp(self, prompt: str) -> str:
+        """Invoke KoboldCpp API without blocking the event loop."""
+        try:
+            self._bind_async_clients()
+            response = await self._apost_with_retry(
+                f"{self.llm_config.api_url}/api/v1/generate",
+                _json_dumps(self._koboldcpp_payload(prompt))
+            )
+            response.raise_for_status()
             
-            return generated_text.strip()
+            return self._koboldcpp_text(_json_loads(response.content))
             
         except Exception as e:
             logger.error(f"KoboldCpp invocation failed: {e}")
             raise
     
+    def _stream_koboldcpp(self, prompt: str) -> Iterator[str]:
+        """Stream tokens from KoboldCpp's server-sent events endpoint."""
+        with self._session.post(
+            f"{self.llm_config.api_url}/api/extra/generate/stream",
+            data=_json_dumps(self._koboldcpp_payload(prompt)),
+            headers=_JSON_HEADERS,
+            stream=True,
+            timeout=60
+        ) as response:
+            response.raise_for_status()
+            # Each server-sent event carries one generated token
+            generated = 0
+            for line in _iter_sse_lines(response):
+                token = _sse_token(line)
+                if token:
+                    generated += 1
+                    yield token
+            self._record_usage(completion_tokens=generated)
+    
+    async def _astream_koboldcpp(self, prompt: str) -> AsyncIterator[str]:
+        """Stream tokens from KoboldCpp without blocking the event loop."""
+        self._bind_async_clients()
+        async with self._ahttp.stream(
+            "POST",
+            f"{self.llm_config.api_url}/api/extra/generate/stream",
+            content=_json_dumps(self._koboldcpp_payload(prompt)),
+            headers=_JSON_HEADERS
+        ) as response:
+            response.raise_for_status()
+            generated = 0
+            async for line in response.aiter_lines():
+                token = _sse_token(line)
+                if token:
+                    generated += 1
+                    yield token
+            self._record_usage(completion_tokens=generated)
+    
+    async def _apost_with_retry(self, url: str, body: bytes) -> Any:
+        """POST a JSON body with the same retry policy as the sync session, sleeping without blocking the loop."""
+        httpx = _load_sdk("httpx")
+        
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                response = await self._ahttp.post(url, content=body, headers=_JSON_HEADERS)
+            except httpx.TransportError as e:
+                if attempt == MAX_RETRIES:
+                    raise
+                logger.warning(f"KoboldCpp request failed ({e}), retrying")
+                await asyncio.sleep(_retry_delay(None, attempt))
+                continue
+            
+            if response.status_code == 429:
+                self._record_rate_limited()
+            if response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                return response
+            logger.warning(f"KoboldCpp returned {response.status_code}, retrying")
+            await asyncio.sleep(_retry_delay(response.headers.get("Retry-After"), attempt))
+    
+    def _koboldcpp_payload(self, prompt: str) -> Dict[str, Any]:
+        """Build the KoboldCpp generate request body."""
+        return {
+            "prompt": prompt,
+            "max_length": self.llm_config.max_tokens or 512,
+            "temperature": self.llm_config.temperature,
+            "top_p": 0.9,
+            "rep_pen": 1.1,
+            "stop_sequence": ["\\n\\nUser:", "\\n\\nQuery:", "\\n\\nHuman:"]
+        }
+    
+    def _koboldcpp_text(self, result: Dict[str, Any]) -> str:
+        """Extract the generated text from a KoboldCpp generate response and account for its tokens."""
+        first_result = result.get("results", [{}])[0]
+        generated_text = first_result.get("text", "")
+        
+        if not generated_text:
+            raise ValueError("Empty response from KoboldCpp")
+        
+        # Recent KoboldCpp builds report token counts; otherwise estimate at ~4 chars per token
+        self._record_usage(
+            prompt_tokens=first_result.get("prompt_tokens", 0),
+            completion_tokens=first_result.get("completion_tokens", len(generated_text) // 4)
+        )
+        
+        return generated_text.strip()
+    
     
     def _invoke_azure_openai(self, prompt: str) -> str:
         """Invoke Azure OpenAI API with standard optimization."""
         try:
-            logger.info(f"Invoking Azure OpenAI model: {self.llm_config.model}")
-            
-            # Customize system instruction based on audience
-            audience = getattr(self, '_current_audience', 'general')
-            if audience == "general":
-                system_instruction = ("You are an AI assistant that provides well-formatted answers using Markdown. "
-                                    "Use **bold** for key terms, *italics* for emphasis, tables for data, and bullet points for lists. "
-                                    "Answer STRICTLY based on the provided context - never use external knowledge. "
-                                    "Start with a direct answer, then provide supporting details in a structured format.")
-            elif audience == "technical":
-                system_instruction = ("You are an AI assistant that provides well-formatted answers using Markdown. "
-                                    "Use **bold** for key terms, *italics* for emphasis, `code blocks` for technical terms, "
-                                    "tables for comparisons, numbered lists for procedures, and Mermaid diagrams for workflows. "
-                                    "Answer STRICTLY based on the provided context - never use external knowledge. "
-                                    "Focus on technical implementation and system configuration. "
-                                    "Start with a direct answer, then provide detailed structured information.")
-            else:
-                system_instruction = self.llm_config.system_instruction
-            
-            # Build proper message structure
-            messages = [
-                {"role": "system", "content": system_instruction},
-                {"role": "user", "content": prompt}
-            ]
-            
-            # Standard parameters
-            params = {
-                "model": self.llm_config.model,
-                "messages": messages,
-            }
-            
-            # Handle different token parameter names for different models
-            if "nano" in self.llm_config.model.lower():
-                params["max_completion_tokens"] = self.llm_config.max_tokens
-                # gpt-5-nano only supports temperature = 1.0 (default)
-                # Don't add temperature parameter for nano model
-            else:
-                params["max_tokens"] = self.llm_config.max_tokens
-                # Add temperature parameter for standard models
-                if self.llm_config.temperature != 1.0:
-                    params["temperature"] = self.llm_config.temperature
+            logger.info("Invoking Azure OpenAI model: %s", self.llm_config.model)
             
-            logger.debug(f"Azure OpenAI request parameters: {params}")
+            params = self._azure_openai_params(prompt)
+            logger.debug("Azure OpenAI request parameters: %s", params)
             
             response = self.client.chat.completions.create(**params)
             
-            # Standard logging
-            logger.info(f"Azure OpenAI response received")
-            logger.debug(f"Response structure: {response}")
+            return self._azure_openai_text(response)
             
-            if response.choices and len(response.choices) > 0:
-                logger.debug(f"Response choices: {len(response.choices)}")
-                logger.debug(f"First choice message: {response.choices[0].message}")
-                logger.debug(f"Finish reason: {response.choices[0].finish_reason}")
-            
-            if hasattr(response, 'usage') and response.usage:
-                logger.info(f"Token usage: {response.usage}")
-            
-            generated_text = response.choices[0].message.content
-            
-            # Handle empty responses
-            if generated_text is None or generated_text == "":
-                logger.warning("Received empty response from Azure OpenAI")
-                generated_text = "I apologize, but I wasn't able to generate a response. Please try rephrasing your question."
+        except Exception as e:
+            if isinstance(e, _load_sdk("openai").RateLimitError):
+                self._record_rate_limited()
+            logger.error(f"Azure OpenAI invocation failed: {e}")
+            logger.debug("Azure OpenAI invocation traceback", exc_info=True)
+            raise
+    
+    async def _ainvoke_azure_openai(self, prompt: str) -> str:
+        """Invoke Azure OpenAI API without blocking the event loop."""
+        try:
+            logger.info("Invoking Azure OpenAI model: %s", self.llm_config.model)
             
-            # Post-process the response for medical context
-            generated_text = self._post_process_response(generated_text)
+            self._bind_async_clients()
+            params = self._azure_openai_params(prompt)
+            logger.debug("Azure OpenAI request parameters: %s", params)
             
-            # Track token usage
-            if hasattr(response, 'usage'):
-                total_tokens = response.usage.total_tokens
-                self._stats["total_tokens_used"] += total_tokens
+            response = await self._aclient.chat.completions.create(**params)
             
-            return generated_text.strip() if generated_text else "No response generated."
+            return self._azure_openai_text(response)
             
         except Exception as e:
+            if isinstance(e, _load_sdk("openai").RateLimitError):
+                self._record_rate_limited()
             logger.error(f"Azure OpenAI invocation failed: {e}")
-            import traceback
-            logger.error(f"Full traceback: {traceback.format_exc()}")
+            logger.debug("Azure OpenAI invocation traceback", exc_info=True)
             raise
     
+    def _stream_azure_openai(self, prompt: str) -> Iterator[str]:
+        """Stream text deltas from an Azure OpenAI chat completion."""
+        stream = self.client.chat.completions.create(
+            **self._azure_openai_params(prompt),
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        for chunk in stream:
+            text = self._azure_stream_text(chunk)
+            if text:
+                yield text
+    
+    async def _astream_azure_openai(self, prompt: str) -> AsyncIterator[str]:
+        """Stream text deltas from Azure OpenAI without blocking the event loop."""
+        self._bind_async_clients()
+        stream = await self._aclient.chat.completions.create(
+            **self._azure_openai_params(prompt),
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        async for chunk in stream:
+            text = self._azure_stream_text(chunk)
+            if text:
+                yield text
+    
+    def _azure_stream_text(self, chunk: Any) -> str:
+        """Return the text delta of a streamed chunk; the last chunk carries usage."""
+        if getattr(chunk, "usage", None):
+            self._record_openai_usage(chunk.usage)
+        if chunk.choices:
+            return chunk.choices[0].delta.content or ""
+        return ""
+    
+    def _azure_openai_params(self, prompt: str) -> Dict[str, Any]:
+        """Build the chat completion parameters for a prompt."""
+        # Customize system instruction based on audience
+        audience = getattr(self, '_current_audience', 'general')
+        system_instruction = _AUDIENCE_SYSTEM_INSTRUCTIONS.get(audience)
+        if system_instruction is None:
+            system_instruction = self.llm_config.system_instruction
+        
+        # Build proper message structure
+        messages = [
+            {"role": "system", "content": system_instruction},
+            {"role": "user", "content": prompt}
+        ]
+        
+        # Standard parameters
+        params = {
+            "model": self.llm_config.model,
+            "messages": messages,
+        }
+        
+        # Handle different token parameter names for different models
+        if "nano" in self.llm_config.model.lower():
+            params["max_completion_tokens"] = self.llm_config.max_tokens
+            # gpt-5-nano only supports temperature = 1.0 (default)
+            # Don't add temperature parameter for nano model
+        else:
+            params["max_tokens"] = self.llm_config.max_tokens
+            # Add temperature parameter for standard models
+            if self.llm_config.temperature != 1.0:
+                params["temperature"] = self.llm_config.temperature
+        
+        return params
+    
+    def _azure_openai_text(self, response: Any) -> str:
+        """Extract, post-process and account for a chat completion response."""
+        # Standard logging
+        logger.info("Azure OpenAI response received")
+        logger.debug("Response structure: %s", response)
+        
+        if response.choices and len(response.choices) > 0:
+            logger.debug("Response choices: %d", len(response.choices))
+            logger.debug("First choice message: %s", response.choices[0].message)
+            logger.debug("Finish reason: %s", response.choices[0].finish_reason)
+        
+        if hasattr(response, 'usage') and response.usage:
+            logger.info("Token usage: %s", response.usage)
+        
+        generated_text = response.choices[0].message.content
+        
+        # Handle empty responses
+        if generated_text is None or generated_text == "":
+            logger.warning("Received empty response from Azure OpenAI")
+            generated_text = "I apologize, but I wasn't able to generate a response. Please try rephrasing your question."
+        
+        # Post-process the response for medical context
+        generated_text = self._post_process_response(generated_text)
+        
+        # Track token usage
+        if getattr(response, 'usage', None):
+            self._record_openai_usage(response.usage)
+        
+        return generated_text.strip() if generated_text else "No response generated."
+    
     def _post_process_response(self, response: str) -> str:
         """Post-process responses for consistency and quality."""
         if not response or response == "No response generated.":
@@ -618,23 +1639,11 @@ The following information requires careful medical reasoning. Consider:
         # Enhance response structure for better readability
         if len(response) > 500 and response.count('\n') < 3:
             # Add paragraph breaks for long responses without structure
-            sentences = response.split('. ')
-            structured_response = ""
-            sentence_count = 0
-            
-            for sentence in sentences:
-                structured_response += sentence
-                if not sentence.endswith('.'):
-                    structured_response += '.'
-                sentence_count += 1
-                
-                # Add paragraph break every 3-4 sentences
-                if sentence_count % 3 == 0 and sentence != sentences[-1]:
-                    structured_response += '\n\n'
-                else:
-                    structured_response += ' '
+            sentences = [s if s.endswith('.') else s + '.' for s in response.split('. ')]
             
-            response = structured_response.strip()
+            # Paragraph break every 3 sentences
+            paragraphs = [" ".join(sentences[i:i + 3]) for i in range(0, len(sentences), 3)]
+            response = "\n\n".join(paragraphs).strip()
         
         return response
     
@@ -643,15 +1652,9 @@ The following information requires careful medical reasoning. Consider:
         # Basic response cleaning
         cleaned_response = response.strip()
         
-        # Remove common artifacts
-        artifacts = [
-            "Assistant:", "AI:", "Response:", "Answer:",
-            "Human:", "User:", "Query:"
-        ]
-        
-        for artifact in artifacts:
-            if cleaned_response.startswith(artifact):
-                cleaned_response = cleaned_response[len(artifact):].strip()
+        # Remove common artifacts (one or more leading labels, any case)
+        if cleaned_response[:9].lower().startswith(_RESPONSE_ARTIFACT_WORDS):
+            cleaned_response = _RESPONSE_ARTIFACT_RE.sub("", cleaned_response, count=1).strip()
         
         # Ensure response is not empty
         if not cleaned_response:
@@ -661,36 +1664,52 @@ The following information requires careful medical reasoning. Consider:
     
     def _update_stats(self, response_time: float, response_length: int) -> None:
         """Update generation statistics with enhanced metrics."""
-        self._stats["total_requests"] += 1
-        self._stats["successful_requests"] += 1
-        
-        # Update average response time
-        total_requests = self._stats["total_requests"]
-        prev_avg = self._stats["avg_response_time"]
-        self._stats["avg_response_time"] = ((prev_avg * (total_requests - 1)) + response_time) / total_requests
-        
-        # Track GPT-4o nano specific features
-        if self.llm_config.use_smart_truncation:
-            self._stats["smart_truncation_applied"] += 1
-        
-        if self.llm_config.context_optimization:
-            self._stats["context_optimization_applied"] += 1
+        with self._stats_lock:
+            self._stats["total_requests"] += 1
+            self._stats["successful_requests"] += 1
+            self._total_response_time += response_time
+            
+            # Track GPT-4o nano specific features
+            if self.llm_config.use_smart_truncation:
+                self._stats["smart_truncation_applied"] += 1
+            
+            if self.llm_config.context_optimization:
+                self._stats["context_optimization_applied"] += 1
     
     def test_connection(self) -> bool:
-        """Test connection to the configured LLM provider."""
+        """Test connection to the configured LLM provider.
+        
+        Uses a metadata request rather than a generation, and reuses the
+        result for HEALTH_CHECK_TTL_SECONDS.
+        """
+        now = time.monotonic()
+        if self._last_health is not None and now - self._last_health[0] < HEALTH_CHECK_TTL_SECONDS:
+            return self._last_health[1]
+        
         try:
             if not self.client:
-                return self.initialize_model()
-            
-            # Simple test query
-            test_prompt = "Respond with 'OK' if you can process this request."
-            response = self._invoke_model(test_prompt)
-            
-            return "ok" in response.lower()
-            
+                healthy = self.initialize_model()
+            else:
+                healthy = self._check_health()
         except Exception as e:
             logger.error(f"Connection test failed: {e}")
-            return False
+            healthy = False
+        
+        self._last_health = (now, healthy)
+        return healthy
+    
+    def _check_health(self) -> bool:
+        """Ask the provider for its model list, which costs no generation."""
+        provider = self.llm_config.provider
+        
+        if provider == "koboldcpp":
+            response = self._session.get(f"{self.llm_config.api_url}/model", timeout=2)
+            return response.status_code == 200
+        elif provider == "azure_openai":
+            self.client.models.list()
+            return True
+        else:
+            raise ValueError(f"Unsupported provider: {provider}. Supported: 'azure_openai', 'koboldcpp'")
     
     def get_model_info(self) -> Dict[str, Any]:
         """Get information about the current model configuration."""
@@ -704,16 +1723,74 @@ The following information requires careful medical reasoning. Consider:
             "prompt_template_path": self.llm_config.prompt_template
         }
     
+    def _record_openai_usage(self, usage: Any) -> None:
+        """Account for the usage block of an OpenAI chat completion."""
+        details = getattr(usage, "completion_tokens_details", None)
+        self._record_usage(
+            prompt_tokens=usage.prompt_tokens,
+            completion_tokens=usage.completion_tokens,
+            reasoning_tokens=getattr(details, "reasoning_tokens", None) or 0
+        )
+    
+    def _record_usage(self, prompt_tokens: int = 0, completion_tokens: int = 0,
+                      reasoning_tokens: int = 0) -> None:
+        """Add one response's token counts to the statistics."""
+        with self._stats_lock:
+            self._stats["prompt_tokens_used"] += prompt_tokens
+            self._stats["completion_tokens_used"] += completion_tokens
+            self._stats["total_tokens_used"] += prompt_tokens + completion_tokens
+            self._stats["reasoning_tokens_used"] += reasoning_tokens
+    
+    def _record_rate_limited(self) -> None:
+        """Count a request the provider rejected with HTTP 429."""
+        with self._stats_lock:
+            self._stats["rate_limited"] += 1
+    
     def get_stats(self) -> Dict[str, Any]:
         """Get generation statistics."""
-        return self._stats.copy()
+        with self._stats_lock:
+            stats = self._stats.copy()
+            total_response_time = self._total_response_time
+            total_time_to_first_token = self._total_time_to_first_token
+            total_time_per_output_token = self._total_time_per_output_token
+        
+        # Averages are computed from running totals only when asked for
+        if stats["total_requests"]:
+            stats["avg_response_time"] = total_response_time / stats["total_requests"]
+        if total_response_time:
+            stats["tokens_per_second"] = stats["completion_tokens_used"] / total_response_time
+        if stats["streamed_requests"]:
+            stats["avg_time_to_first_token"] = total_time_to_first_token / stats["streamed_requests"]
+            stats["avg_time_per_output_token"] = total_time_per_output_token / stats["streamed_requests"]
+        return stats
     
     def reset_stats(self) -> None:
         """Reset statistics tracking."""
-        self._stats = {
+        with self._stats_lock:
+            self._stats = self._new_stats()
+            self._total_response_time = 0.0
+            self._total_time_to_first_token = 0.0
+            self._total_time_per_output_token = 0.0
+        logger.info("Statistics reset")
+    
+    @staticmethod
+    def _new_stats() -> Dict[str, Any]:
+        """Return zeroed statistics counters."""
+        return {
             "total_requests": 0,
             "avg_response_time": 0,
             "total_tokens_used": 0,
-            "successful_requests": 0
-        }
-        logger.info("Statistics reset")
\ No newline at end of file
+            "prompt_tokens_used": 0,
+            "completion_tokens_used": 0,
+            "tokens_per_second": 0,  # completion tokens over total response time
+            "successful_requests": 0,
+            "reasoning_tokens_used": 0,  # GPT-4o nano specific
+            "smart_truncation_applied": 0,
+            "context_optimization_applied": 0,
+            "domain_disclaimers_added": 0,
+            "cache_hits": 0,
+            "rate_limited": 0,
+            "streamed_requests": 0,
+            "avg_time_to_first_token": 0,
+            "avg_time_per_output_token": 0
+        }
\ No newline at end of file
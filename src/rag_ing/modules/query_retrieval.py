@@ -15,6 +15,7 @@ from langchain_core.embeddings import Embeddings
 from langchain_core.vectorstores import VectorStore
 from ..config.settings import Settings, RetrievalConfig
 from ..utils.exceptions import RetrievalError
+from ..utils.faiss_store import load_faiss_store
 from ..retrieval import (
     QueryExpansionEngine,
     MultiQueryRetriever,
@@ -185,6 +186,22 @@ class QueryRetrievalModule:
                     logger.warning(f"Failed to load existing vector store: {e}")
                     logger.info("Using mock vector store for demonstration")
                     self.vector_store = self._create_mock_vector_store()
+            
+            elif vector_store_config.type == "faiss":
+                # Memory-map the saved index so only touched pages are read
+                try:
+                    self.vector_store = load_faiss_store(
+                        vector_store_config.path,
+                        self.embedding_model,
+                        mmap=vector_store_config.mmap
+                    )
+                    if self.vector_store is None:
+                        logger.warning(f"No FAISS index found under {vector_store_config.path}, using mock vector store")
+                        self.vector_store = self._create_mock_vector_store()
+                except Exception as e:
+                    logger.warning(f"Failed to load FAISS index: {e}")
+                    logger.info("Using mock vector store for demonstration")
+                    self.vector_store = self._create_mock_vector_store()
                     
         except Exception as e:
             logger.error(f"Failed to initialize components: {e}")
@@ -232,10 +249,13 @@ class QueryRetrievalModule:
         
         # Use the same wrapper class as in corpus embedding
         class AzureEmbeddingWrapper:
-            def __init__(self, client, model_name, deployment_name):
+            def __init__(self, client, model_name, deployment_name, client_kwargs, max_concurrency=8):
                 self.client = client
                 self.model_name = model_name
                 self.deployment_name = deployment_name
+                # Credentials for building an async client per event loop
+                self.client_kwargs = client_kwargs
+                self.max_concurrency = max_concurrency
             
             def embed_query(self, text: str) -> List[float]:
                 """Embed a single query text."""
@@ -246,25 +266,57 @@ class QueryRetrievalModule:
                 return response.data[0].embedding
             
             def embed_documents(self, texts: List[str]) -> List[List[float]]:
-                """Embed multiple documents."""
+                """Embed multiple documents, sending batches concurrently."""
                 batch_size = 16
-                all_embeddings = []
+                batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
                 
-                for i in range(0, len(texts), batch_size):
-                    batch = texts[i:i + batch_size]
+                if len(batches) > 1:
+                    try:
+                        asyncio.get_running_loop()
+                    except RuntimeError:
+                        return asyncio.run(self._aembed_batches(batches))
+                    # Already inside an event loop (e.g. a FastAPI handler), where
+                    # asyncio.run is not allowed - fall through to sequential calls
+                
+                all_embeddings = []
+                for batch in batches:
                     response = self.client.embeddings.create(
                         input=batch,
                         model=self.deployment_name
                     )
-                    batch_embeddings = [data.embedding for data in response.data]
-                    all_embeddings.extend(batch_embeddings)
+                    all_embeddings.extend(data.embedding for data in response.data)
                 
                 return all_embeddings
+            
+            async def _aembed_batches(self, batches: List[List[str]]) -> List[List[float]]:
+                """Embed batches concurrently, bounded by a semaphore for rate limits."""
+                from openai import AsyncAzureOpenAI
+                
+                semaphore = asyncio.Semaphore(self.max_concurrency)
+                
+                async with AsyncAzureOpenAI(**self.client_kwargs) as async_client:
+                    async def embed_batch(batch):
+                        async with semaphore:
+                            response = await async_client.embeddings.create(
+                                input=batch,
+                                model=self.deployment_name
+                            )
+                        return [data.embedding for data in response.data]
+                    
+                    # gather preserves input order, so embeddings line up with texts
+                    results = await asyncio.gather(*(embed_batch(batch) for batch in batches))
+                
+                return [embedding for batch_embeddings in results for embedding in batch_embeddings]
         
         self.embedding_model = AzureEmbeddingWrapper(
             client=azure_client,
             model_name=embedding_config.azure_openai.model,
-            deployment_name=embedding_config.azure_openai.deployment_name
+            deployment_name=embedding_config.azure_openai.deployment_name,
+            client_kwargs={
+                "api_key": api_key,
+                "azure_endpoint": endpoint,
+                "api_version": api_version
+            }
         )
         
         logger.info(f"Azure embedding model loaded for queries: {embedding_config.azure_openai.model}")
@@ -9,7 +9,6 @@ This module coordinates all 5 core modules to provide a complete RAG system:
 """
 
 import time
-import hashlib
 import asyncio
 from typing import Dict, List, Any, Optional
 import logging
@@ -22,7 +21,7 @@ from .modules import (
     UILayerModule,
     EvaluationLoggingModule
 )
-from .modules.evaluation_logging import QueryEvent, RetrievalMetrics, GenerationMetrics
+from .modules.evaluation_logging import QueryEvent, RetrievalMetrics, GenerationMetrics, hash_query
 from .utils.exceptions import RAGError, UIError
 from .utils.activity_logger import ActivityLogger
 
@@ -124,7 +123,7 @@ class RAGOrchestrator:
             Complete response with metadata
         """
         start_time = time.time()
-        query_hash = hashlib.md5(query.encode()).hexdigest()[:8]
+        query_hash = hash_query(query)
         
         logger.info(f"Processing query [{query_hash}]: {query[:100]}...")
         
@@ -256,7 +255,7 @@ class RAGOrchestrator:
             Complete response with enhanced metadata
         """
         start_time = time.time()
-        query_hash = hashlib.md5(query.encode()).hexdigest()[:8]
+        query_hash = hash_query(query)
         
         logger.info(f"[NEW] Processing query with multi-query expansion [{query_hash}]: {query[:100]}...")
         
@@ -6,6 +6,7 @@ from .activity_logger import ActivityLogger
 from .duplicate_detector import DuplicateDetector
 from .document_summarizer import DocumentSummarizer
 from .ingestion_tracker_sqlite import IngestionTrackerSQLite
+from .embedding_cache import EmbeddingCache, CachedEmbeddingModel
 
 __all__ = [
     'TempFileManager',
@@ -17,5 +18,7 @@ __all__ = [
     'ActivityLogger',
     'DuplicateDetector',
     'DocumentSummarizer',
-    'IngestionTrackerSQLite'
+    'IngestionTrackerSQLite',
+    'EmbeddingCache',
+    'CachedEmbeddingModel'
 ]
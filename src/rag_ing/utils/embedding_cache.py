@@ -0,0 +1,181 @@
+"""Content-addressed embedding cache for corpus ingestion.
+
+Stores embedding vectors in SQLite keyed on (model, sha256(text)) so repeat
+ingestion runs skip the embedding API call for chunks that have not changed.
+Runs of whitespace are collapsed before hashing, so re-formatted page versions
+reuse the cached vector. Vectors are stored as raw float32 bytes.
+"""
+
+import hashlib
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from typing import List, Dict, Optional
+from contextlib import contextmanager
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# SQLite limits the number of host parameters per statement (999 on older builds)
+_SQL_BATCH_SIZE = 900
+
+
+def hash_text(text: str) -> str:
+    """Return the SHA256 hex digest used as the cache key for a text.
+    
+    Whitespace is normalized first; whitespace-only edits barely move an
+    embedding, so they should not cost a new API call.
+    """
+    return hashlib.sha256(" ".join(text.split()).encode('utf-8')).hexdigest()
+
+
+class EmbeddingCache:
+    """SQLite-backed store of embedding vectors keyed by model and content hash."""
+
+    def __init__(self, db_path: str = "./vector_store/embedding_cache.db"):
+        """Initialize cache database.
+
+        Args:
+            db_path: Path to SQLite database file
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._init_database()
+        logger.info(f"EmbeddingCache initialized: {self.db_path}")
+
+    @contextmanager
+    def _get_connection(self):
+        """Context manager for database connections with proper cleanup."""
+        conn = sqlite3.connect(str(self.db_path))
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _init_database(self):
+        """Create cache table if not exists."""
+        with self._get_connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS embedding_cache (
+                    model TEXT NOT NULL,
+                    sha TEXT NOT NULL,
+                    dim INTEGER NOT NULL,
+                    vec BLOB NOT NULL,
+                    PRIMARY KEY (model, sha)
+                )
+            """)
+            conn.commit()
+
+    def get_many(self, model: str, hashes: List[str]) -> Dict[str, List[float]]:
+        """Look up cached vectors for a list of content hashes.
+
+        Args:
+            model: Embedding model identifier
+            hashes: Content hashes to look up
+
+        Returns:
+            Dict mapping each found hash to its vector
+        """
+        found = {}
+        unique_hashes = list(dict.fromkeys(hashes))
+
+        with self._get_connection() as conn:
+            for i in range(0, len(unique_hashes), _SQL_BATCH_SIZE):
+                batch = unique_hashes[i:i + _SQL_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT sha, vec FROM embedding_cache WHERE model = ? AND sha IN ({placeholders})",
+                    [model, *batch]
+                ).fetchall()
+                for sha, vec in rows:
+                    found[sha] = np.frombuffer(vec, dtype=np.float32).tolist()
+
+        return found
+
+    def put_many(self, model: str, entries: Dict[str, List[float]]) -> None:
+        """Store vectors for a set of content hashes in one transaction.
+
+        Args:
+            model: Embedding model identifier
+            entries: Dict mapping content hash to vector
+        """
+        if not entries:
+            return
+
+        rows = []
+        for sha, vector in entries.items():
+            vec = np.asarray(vector, dtype=np.float32)
+            rows.append((model, sha, int(vec.shape[0]), vec.tobytes()))
+
+        with self._get_connection() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embedding_cache (model, sha, dim, vec) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            conn.commit()
+
+    def count(self, model: Optional[str] = None) -> int:
+        """Return number of cached vectors, optionally for a single model."""
+        with self._get_connection() as conn:
+            if model is None:
+                row = conn.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()
+            else:
+                row = conn.execute(
+                    "SELECT COUNT(*) FROM embedding_cache WHERE model = ?", (model,)
+                ).fetchone()
+        return row[0]
+
+
+class CachedEmbeddingModel:
+    """LangChain-compatible embedding wrapper that consults an EmbeddingCache.
+
+    Only ``embed_documents`` is cached; query embeddings are always computed
+    fresh since queries rarely repeat verbatim during ingestion.
+    """
+
+    def __init__(self, embedding_model, cache: EmbeddingCache, model_name: str):
+        """Wrap an embedding model with a persistent cache.
+
+        Args:
+            embedding_model: Object exposing embed_documents/embed_query
+            cache: EmbeddingCache instance
+            model_name: Model identifier included in the cache key
+        """
+        self.embedding_model = embedding_model
+        self.cache = cache
+        self.model_name = model_name
+        self.hits = 0
+        self.misses = 0
+        # Batches may be embedded from several threads at once
+        self._stats_lock = threading.Lock()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts, reusing cached vectors for unchanged content."""
+        hashes = [hash_text(text) for text in texts]
+        cached = self.cache.get_many(self.model_name, hashes)
+
+        # Embed each uncached text once, even if it repeats within the batch
+        miss_texts = {}
+        for sha, text in zip(hashes, texts):
+            if sha not in cached and sha not in miss_texts:
+                miss_texts[sha] = text
+
+        if miss_texts:
+            new_vectors = self.embedding_model.embed_documents(list(miss_texts.values()))
+            new_entries = dict(zip(miss_texts.keys(), new_vectors))
+            self.cache.put_many(self.model_name, new_entries)
+            cached.update(new_entries)
+
+        with self._stats_lock:
+            self.hits += len(texts) - len(miss_texts)
+            self.misses += len(miss_texts)
+        logger.debug(f"Embedding cache: {len(texts) - len(miss_texts)} hits, {len(miss_texts)} misses")
+
+        return [cached[sha] for sha in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a single query without caching."""
+        return self.embedding_model.embed_query(text)
@@ -6,6 +6,8 @@ Supports Azure OpenAI and local open-source models with easy switching
 import os
 import time
 import logging
+import functools
+import threading
 from typing import List, Dict, Any, Optional, Union
 from abc import ABC, abstractmethod
 
@@ -53,8 +55,10 @@ class AzureOpenAIEmbeddingProvider(BaseEmbeddingProvider):
         self.retry_delay = config.get('retry_delay', 2)
         self.requests_per_minute = config.get('requests_per_minute', 60)
         
-        self._last_request_time = 0
+        # Start time of the latest reserved request slot, shared by all threads
+        self._last_request_time = float('-inf')
         self._request_interval = 60.0 / self.requests_per_minute
+        self._rate_limit_lock = threading.Lock()
         
         # Initialize Azure OpenAI client
         self._init_client()
@@ -87,15 +91,19 @@ class AzureOpenAIEmbeddingProvider(BaseEmbeddingProvider):
             raise
     
     def _rate_limit(self):
-        """Enforce rate limiting between requests"""
-        current_time = time.time()
-        time_since_last = current_time - self._last_request_time
+        """Enforce rate limiting between requests, across threads
         
-        if time_since_last < self._request_interval:
-            sleep_time = self._request_interval - time_since_last
-            time.sleep(sleep_time)
+        Each caller reserves the next free slot under the lock and then sleeps
+        until it outside the lock, so concurrent batches queue up one interval
+        apart instead of all passing the check together.
+        """
+        with self._rate_limit_lock:
+            current_time = time.monotonic()
+            slot = max(current_time, self._last_request_time + self._request_interval)
+            self._last_request_time = slot
         
-        self._last_request_time = time.time()
+        if slot > current_time:
+            time.sleep(slot - current_time)
     
     def _retry_with_backoff(self, func, *args, **kwargs):
         """Retry function with exponential backoff"""
@@ -135,6 +143,67 @@ class AzureOpenAIEmbeddingProvider(BaseEmbeddingProvider):
         return f"azure_openai ({self.model})"
 
 
+@functools.lru_cache(maxsize=4)
+def _load_sentence_transformer(model_name: str, device: str, cache_folder: str,
+                               dtype: str, compile_model: bool):
+    """Load a SentenceTransformer, reusing it for identical settings in-process.
+    
+    Cached so repeated providers (e.g. one per process_corpus run) skip the
+    multi-second model reload.
+    
+    Returns:
+        Tuple of (model, embedding dimension)
+    """
+    from sentence_transformers import SentenceTransformer
+    import torch
+    
+    logger.info(f"Loading model: {model_name}...")
+    
+    # Load model (downloads if not cached)
+    model = SentenceTransformer(
+        model_name,
+        device=device,
+        cache_folder=cache_folder
+    )
+    
+    eager_model = _apply_precision(model, torch, device, dtype, compile_model)
+    
+    # Get dimension by encoding test text (also triggers torch.compile)
+    try:
+        test_embedding = model.encode("test")
+    except Exception as e:
+        if not compile_model:
+            raise
+        logger.warning(f"[!] torch.compile failed, using eager model: {e}")
+        model[0].auto_model = eager_model
+        test_embedding = model.encode("test")
+    
+    return model, len(test_embedding)
+
+
+def _apply_precision(model, torch, device: str, dtype: str, compile_model: bool):
+    """Cast weights to the configured dtype and optionally compile the transformer
+    
+    Returns:
+        The uncompiled transformer module, for falling back if compilation fails
+    """
+    if dtype == 'fp16':
+        if device == 'cpu':
+            logger.warning("[!] fp16 is slow on CPU, keeping fp32 (use bf16 instead)")
+        else:
+            model.half()
+    elif dtype == 'bf16':
+        model.to(dtype=torch.bfloat16)
+    elif dtype != 'fp32':
+        raise ValueError(f"Unsupported dtype: {dtype}. Use fp32, fp16 or bf16")
+    
+    eager_model = model[0].auto_model
+    if compile_model:
+        # Compilation happens lazily on the first forward pass
+        model[0].auto_model = torch.compile(eager_model, mode="reduce-overhead")
+    return eager_model
+
+
 class LocalEmbeddingProvider(BaseEmbeddingProvider):
     """Local Open-Source Embedding Provider (BGE, E5, etc.)"""
     
@@ -148,6 +217,8 @@ class LocalEmbeddingProvider(BaseEmbeddingProvider):
         self.show_progress = config.get('show_progress', True)
         self.num_threads = config.get('num_threads', 4)
         self.cache_folder = config.get('cache_folder', './models/embeddings')
+        self.dtype = config.get('dtype', 'fp32')  # fp32 | fp16 | bf16
+        self.compile_model = config.get('compile', False)
         
         # Create cache folder
         os.makedirs(self.cache_folder, exist_ok=True)
@@ -159,31 +230,26 @@ class LocalEmbeddingProvider(BaseEmbeddingProvider):
         logger.info(f"     Model: {self.model_name}")
         logger.info(f"     Device: {self.device}")
         logger.info(f"     Batch size: {self.batch_size}")
+        logger.info(f"     Precision: {self.dtype}{' (compiled)' if self.compile_model else ''}")
         logger.info(f"     Vector dimension: {self._dimension}")
     
     def _init_model(self):
         """Initialize sentence transformer model"""
         try:
-            from sentence_transformers import SentenceTransformer
             import torch
             
-            logger.info(f"Loading model: {self.model_name}...")
-            
             # Set number of threads for CPU
             if self.device == 'cpu':
                 torch.set_num_threads(self.num_threads)
             
-            # Load model (downloads if not cached)
-            self.model = SentenceTransformer(
+            self.model, self._dimension = _load_sentence_transformer(
                 self.model_name,
-                device=self.device,
-                cache_folder=self.cache_folder
+                self.device,
+                self.cache_folder,
+                self.dtype,
+                self.compile_model
             )
             
-            # Get dimension by encoding test text
-            test_embedding = self.model.encode("test", normalize_embeddings=self.normalize)
-            self._dimension = len(test_embedding)
-            
             logger.info(f"[OK] Model loaded successfully")
             
         except ImportError:
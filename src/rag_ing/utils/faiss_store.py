@@ -0,0 +1,240 @@
+"""FAISS vector store persistence helpers.
+
+Shared by corpus ingestion (writer) and query retrieval (reader) so both agree
+on the on-disk layout: <vector_store.path>/faiss_index/{index.faiss,docstore.sqlite}.
+
+The raw index is written with faiss.write_index and the documents go to a
+SQLite sidecar, so a memory-mapped reader looks documents up per hit instead
+of unpickling the whole docstore into RAM. Indexes saved by older versions
+with LangChain's index.pkl are still loaded.
+"""
+
+import os
+import json
+import shutil
+import sqlite3
+import tempfile
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Iterator, Mapping, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+FAISS_INDEX_DIRNAME = "faiss_index"
+FAISS_INDEX_FILENAME = "index.faiss"
+DOCSTORE_FILENAME = "docstore.sqlite"
+LEGACY_DOCSTORE_FILENAME = "index.pkl"
+
+
+def get_faiss_index_path(store_path: str) -> Path:
+    """Return the directory holding the persisted FAISS index."""
+    return Path(store_path) / FAISS_INDEX_DIRNAME
+
+
+def mmap_io_flags() -> int:
+    """FAISS read flags that memory-map index data instead of loading it into RAM.
+
+    Newer FAISS maps the whole file with IO_FLAG_MMAP_IFC, covering flat codes
+    and IVF lists alike. It cannot be combined with IO_FLAG_MMAP, which fails on
+    IVF indexes, so IO_FLAG_MMAP (IVF lists only) is the fallback for older builds.
+    """
+    import faiss
+
+    if hasattr(faiss, "IO_FLAG_MMAP_IFC"):
+        return faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY
+    return faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+
+
+def load_faiss_store(store_path: str, embedding_model: Any, mmap: bool = True) -> Optional[Any]:
+    """Load a persisted FAISS store, memory-mapped when requested.
+
+    With mmap the documents stay in the SQLite sidecar and are read per search
+    hit; without it (ingestion, which appends) they are loaded into memory.
+
+    Args:
+        store_path: vector_store.path from config
+        embedding_model: Embedding model used for queries
+        mmap: Page index data in on demand rather than reading it all
+
+    Returns:
+        LangChain FAISS store, or None if no index has been saved yet
+    """
+    import faiss
+    from langchain_community.vectorstores import FAISS
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+
+    index_path = get_faiss_index_path(store_path)
+    if not (index_path / FAISS_INDEX_FILENAME).exists():
+        return None
+
+    docstore_path = index_path / DOCSTORE_FILENAME
+    if docstore_path.exists():
+        index = faiss.read_index(str(index_path / FAISS_INDEX_FILENAME), mmap_io_flags() if mmap else 0)
+        if mmap:
+            docstore = SQLiteDocstore(str(docstore_path))
+            index_to_docstore_id = SQLiteIndexToDocstoreId(docstore)
+        else:
+            docstore = InMemoryDocstore()
+            index_to_docstore_id = {}
+            with sqlite3.connect(str(docstore_path)) as conn:
+                rows = conn.execute("SELECT position, id, page_content, metadata FROM docs ORDER BY position")
+                for position, doc_id, page_content, metadata in rows:
+                    index_to_docstore_id[position] = doc_id
+                    docstore.add({doc_id: _make_document(doc_id, page_content, metadata)})
+        store = FAISS(embedding_model, index, docstore, index_to_docstore_id)
+    else:
+        store = FAISS.load_local(
+            str(index_path),
+            embedding_model,
+            # The docstore pickle is written by our own ingestion pipeline
+            allow_dangerous_deserialization=True,
+            io_flags=mmap_io_flags() if mmap else 0
+        )
+    _apply_index_metric(store)
+    logger.info(f"FAISS index loaded from {index_path} ({store.index.ntotal} vectors, mmap={mmap})")
+    return store
+
+
+def _make_document(doc_id: str, page_content: str, metadata: str) -> Any:
+    """Rebuild a Document from a docstore row."""
+    from langchain_core.documents import Document
+
+    return Document(id=doc_id, page_content=page_content, metadata=json.loads(metadata))
+
+
+class SQLiteDocstore:
+    """Read-only LangChain docstore backed by the SQLite sidecar.
+
+    Documents are fetched by id on demand, so memory use does not grow with
+    the corpus. The connection is shared between threads behind a lock.
+    """
+
+    def __init__(self, db_path: str):
+        """Open the sidecar read-only.
+
+        Args:
+            db_path: Path to docstore.sqlite
+        """
+        self.db_path = db_path
+        self._conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+
+    def search(self, search: str) -> Union[str, Any]:
+        """Return the document with the given id, or a not-found message."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT page_content, metadata FROM docs WHERE id = ?", (search,)
+            ).fetchone()
+        if row is None:
+            return f"ID {search} not found."
+        return _make_document(search, *row)
+
+    def id_at(self, position: int) -> Optional[str]:
+        """Return the document id stored for an index position."""
+        with self._lock:
+            row = self._conn.execute("SELECT id FROM docs WHERE position = ?", (position,)).fetchone()
+        return row[0] if row else None
+
+    def count(self) -> int:
+        """Return the number of stored documents."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+
+class SQLiteIndexToDocstoreId(Mapping):
+    """Lazy index position -> document id mapping over a SQLiteDocstore.
+
+    Stands in for FAISS.index_to_docstore_id so the id list is not loaded up front.
+    """
+
+    def __init__(self, docstore: SQLiteDocstore):
+        self._docstore = docstore
+
+    def __getitem__(self, position: int) -> str:
+        doc_id = self._docstore.id_at(int(position))
+        if doc_id is None:
+            raise KeyError(position)
+        return doc_id
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(range(len(self)))
+
+    def __len__(self) -> int:
+        return self._docstore.count()
+
+
+def cosine_relevance_score(similarity: float) -> float:
+    """Map a cosine similarity in [-1, 1] to a relevance score in [0, 1].
+
+    Quantized indexes only approximate the dot product, so the result is clamped.
+    """
+    return min(1.0, max(0.0, (1.0 + similarity) / 2.0))
+
+
+def _apply_index_metric(store: Any) -> None:
+    """Match the store's distance strategy to the persisted index metric.
+
+    LangChain does not pickle the distance strategy, so an inner-product index
+    would otherwise be scored as L2 distance after reload.
+    """
+    import faiss
+    from langchain_community.vectorstores.utils import DistanceStrategy
+
+    if store.index.metric_type == faiss.METRIC_INNER_PRODUCT:
+        store.distance_strategy = DistanceStrategy.MAX_INNER_PRODUCT
+        store._normalize_L2 = True
+        store.override_relevance_score_fn = cosine_relevance_score
+
+
+def save_faiss_store(store: Any, store_path: str) -> Path:
+    """Persist a FAISS store, atomically replacing any existing files.
+
+    Files are written to a temporary directory and renamed into place, so a
+    process that has the previous index memory-mapped keeps reading the old
+    inode instead of a truncated file.
+    """
+    import faiss
+
+    index_path = get_faiss_index_path(store_path)
+    index_path.mkdir(parents=True, exist_ok=True)
+
+    tmp_dir = tempfile.mkdtemp(prefix=".faiss_tmp_", dir=str(index_path.parent))
+    try:
+        faiss.write_index(store.index, os.path.join(tmp_dir, FAISS_INDEX_FILENAME))
+        _write_docstore(store, os.path.join(tmp_dir, DOCSTORE_FILENAME))
+        for filename in os.listdir(tmp_dir):
+            os.replace(os.path.join(tmp_dir, filename), index_path / filename)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    # The sidecar supersedes a pickle left by an older version
+    legacy_path = index_path / LEGACY_DOCSTORE_FILENAME
+    if legacy_path.exists():
+        legacy_path.unlink()
+
+    return index_path
+
+
+def _write_docstore(store: Any, db_path: str) -> None:
+    """Write the store's documents to a fresh SQLite sidecar, keyed by index position."""
+    from langchain_core.documents import Document
+
+    def rows() -> Iterator[tuple]:
+        for position, doc_id in store.index_to_docstore_id.items():
+            doc = store.docstore.search(doc_id)
+            if not isinstance(doc, Document):
+                raise ValueError(f"Document {doc_id} missing from FAISS docstore")
+            yield position, doc_id, doc.page_content, json.dumps(doc.metadata, default=str)
+
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("""
+            CREATE TABLE docs (
+                position INTEGER PRIMARY KEY,
+                id TEXT NOT NULL UNIQUE,
+                page_content TEXT NOT NULL,
+                metadata TEXT NOT NULL
+            )
+        """)
+        conn.executemany("INSERT INTO docs VALUES (?, ?, ?, ?)", rows())
+    conn.close()
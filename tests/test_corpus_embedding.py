@@ -0,0 +1,170 @@
+"""Unit tests for corpus ingestion bookkeeping in CorpusEmbeddingModule."""
+
+import numpy as np
+import pytest
+from langchain_community.embeddings import DeterministicFakeEmbedding
+from langchain_core.documents import Document
+
+from src.rag_ing.config.settings import Settings
+from src.rag_ing.modules import corpus_embedding
+from src.rag_ing.modules.corpus_embedding import (
+    CorpusEmbeddingModule,
+    _chunk_id,
+    _select_new_chunks,
+)
+
+
+def make_settings(tmp_path):
+    settings = Settings()
+    settings.vector_store.path = str(tmp_path / "vector_store")
+    settings.duplicate_detection.enabled = False
+    settings.chunking.drop_near_duplicates = False
+    settings.chunking.chunk_size = 300
+    settings.chunking.overlap = 0
+    return settings
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    for name in ("a", "b"):
+        (data_dir / f"{name}.txt").write_text(f"{name} words here. " * 10)
+    return data_dir
+
+
+def run_local_ingestion(settings, data_dir):
+    """Ingest, chunk and store local files as process_corpus does; return the stored chunks."""
+    module = CorpusEmbeddingModule(settings)
+    stored = []
+    module._add_to_chroma = lambda vector_store, docs: stored.extend(docs)
+
+    documents = module._ingest_local_files_enhanced(
+        {"path": str(data_dir), "file_types": [".txt"], "extraction_workers": 1}
+    )
+    module._store_embeddings(module._chunk_documents(documents))
+    module._save_local_file_manifest()
+    return stored
+
+
+def stored_sources(chunks):
+    return {chunk.metadata["filename"] for chunk in chunks}
+
+
+class TestLocalFileManifest:
+    """Tests for skipping local files that were stored by an earlier run."""
+
+    def test_files_cut_by_max_chunks_are_ingested_again(self, tmp_path, data_dir):
+        settings = make_settings(tmp_path)
+        settings.chunking.max_chunks = 1
+        first = run_local_ingestion(settings, data_dir)
+        assert len(stored_sources(first)) == 1
+
+        settings.chunking.max_chunks = None
+        second = run_local_ingestion(settings, data_dir)
+
+        assert stored_sources(second) == {"a.txt", "b.txt"} - stored_sources(first)
+
+    def test_unchanged_files_are_skipped(self, tmp_path, data_dir):
+        settings = make_settings(tmp_path)
+        assert stored_sources(run_local_ingestion(settings, data_dir)) == {"a.txt", "b.txt"}
+
+        assert run_local_ingestion(settings, data_dir) == []
+
+    def test_changed_file_is_ingested_again(self, tmp_path, data_dir):
+        settings = make_settings(tmp_path)
+        run_local_ingestion(settings, data_dir)
+
+        (data_dir / "a.txt").write_text("a has new words now.")
+
+        assert stored_sources(run_local_ingestion(settings, data_dir)) == {"a.txt"}
+
+    @pytest.mark.parametrize("change", [
+        lambda settings: setattr(settings.vector_store, "collection_name", "other_docs"),
+        lambda settings: setattr(settings.chunking, "chunk_size", 200),
+        lambda settings: setattr(settings.embedding_model.azure_openai, "deployment_name", "other"),
+    ])
+    def test_settings_change_ignores_manifest(self, tmp_path, data_dir, change):
+        settings = make_settings(tmp_path)
+        run_local_ingestion(settings, data_dir)
+
+        change(settings)
+
+        assert stored_sources(run_local_ingestion(settings, data_dir)) == {"a.txt", "b.txt"}
+
+
+class CountingEmbedding(DeterministicFakeEmbedding):
+    """Fake embedding model that records the texts it embeds."""
+
+    embedded: list = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return super().embed_documents(texts)
+
+
+def make_chunk(text, source="guide.md", chunk_index=0):
+    return Document(page_content=text, metadata={"source": source, "chunk_index": chunk_index})
+
+
+class TestChunkIds:
+    """Tests for deterministic chunk ids and re-ingestion into Chroma."""
+
+    def test_chunk_id_is_stable_and_depends_on_source_position_and_content(self):
+        chunk = make_chunk("alpha")
+
+        assert _chunk_id(chunk) == _chunk_id(make_chunk("alpha"))
+        assert _chunk_id(chunk) != _chunk_id(make_chunk("beta"))
+        assert _chunk_id(chunk) != _chunk_id(make_chunk("alpha", source="other.md"))
+        assert _chunk_id(chunk) != _chunk_id(make_chunk("alpha", chunk_index=1))
+
+    def test_select_new_chunks_skips_stored_and_repeated_ids(self):
+        docs = [make_chunk("alpha"), make_chunk("beta"), make_chunk("alpha"), make_chunk("gamma")]
+        ids = [_chunk_id(doc) for doc in docs]
+
+        new_chunks = _select_new_chunks(docs, ids, {ids[1]})
+
+        assert list(new_chunks) == [ids[0], ids[3]]
+        assert new_chunks[ids[0]] is docs[0]
+
+    def test_reingesting_stored_chunks_skips_them(self, tmp_path):
+        module = CorpusEmbeddingModule(make_settings(tmp_path))
+        module.embedding_model = CountingEmbedding(size=8)
+        module._setup_chroma_store()
+        chunks = [make_chunk(f"chunk {i}", chunk_index=i) for i in range(5)]
+
+        module._add_to_chroma(module.vector_store, chunks[:3])
+        module._add_to_chroma(module.vector_store, chunks)
+
+        collection = module.vector_store._collection
+        assert collection.count() == 5
+        assert sorted(collection.get()["ids"]) == sorted(_chunk_id(chunk) for chunk in chunks)
+        assert module.embedding_model.embedded == [f"chunk {i}" for i in range(5)]
+        assert module._stats["chunks_already_stored"] == 3
+
+
+class TestEmbedTexts:
+    """Tests for length-sorted embedding in _embed_texts."""
+
+    @pytest.fixture
+    def module(self, tmp_path):
+        module = CorpusEmbeddingModule(make_settings(tmp_path))
+        module.embedding_model = CountingEmbedding(size=8)
+        return module
+
+    def test_rows_follow_input_order(self, module, monkeypatch):
+        monkeypatch.setattr(corpus_embedding, "EMBEDDING_BATCH_SIZE", 2)
+        texts = ["a much longer text than the rest", "mid text", "x", "medium-ish", "tiny"]
+
+        embeddings = module._embed_texts(texts)
+
+        # Requests went out shortest first, but each row belongs to its own input
+        assert module.embedding_model.embedded == sorted(texts, key=len)
+        expected = np.array([module.embedding_model.embed_query(text) for text in texts], dtype=np.float32)
+        np.testing.assert_array_equal(embeddings, expected)
+
+    def test_empty_input_returns_no_rows(self, module):
+        embeddings = module._embed_texts([])
+
+        assert embeddings.shape[0] == 0
+        assert module.embedding_model.embedded == []
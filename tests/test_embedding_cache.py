@@ -0,0 +1,64 @@
+"""Unit tests for the content-addressed embedding cache."""
+
+import pytest
+
+from src.rag_ing.utils.embedding_cache import EmbeddingCache, CachedEmbeddingModel, hash_text
+
+
+class FakeEmbeddingModel:
+    """Embedding model stub that records which texts were embedded."""
+
+    def __init__(self):
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(text)), 0.5] for text in texts]
+
+    def embed_query(self, text):
+        return [float(len(text)), 0.5]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return EmbeddingCache(str(tmp_path / "embedding_cache.db"))
+
+
+class TestEmbeddingCache:
+    """Tests for EmbeddingCache and CachedEmbeddingModel."""
+
+    def test_put_and_get_roundtrip(self, cache):
+        cache.put_many("model-a", {"abc": [1.0, 2.0, 3.0]})
+
+        assert cache.get_many("model-a", ["abc", "missing"]) == {"abc": [1.0, 2.0, 3.0]}
+        assert cache.get_many("model-b", ["abc"]) == {}
+        assert cache.count() == 1
+
+    def test_repeat_run_skips_embedding(self, cache):
+        model = FakeEmbeddingModel()
+        cached_model = CachedEmbeddingModel(model, cache, model_name="model-a")
+
+        first = cached_model.embed_documents(["alpha", "beta"])
+        second = cached_model.embed_documents(["beta", "gamma", "alpha"])
+
+        assert model.calls == [["alpha", "beta"], ["gamma"]]
+        assert second == [first[1], [5.0, 0.5], first[0]]
+        assert cached_model.hits == 2
+        assert cached_model.misses == 3
+
+    def test_duplicate_texts_embedded_once(self, cache):
+        model = FakeEmbeddingModel()
+        cached_model = CachedEmbeddingModel(model, cache, model_name="model-a")
+
+        vectors = cached_model.embed_documents(["same", "same"])
+
+        assert model.calls == [["same"]]
+        assert vectors[0] == vectors[1]
+        assert cache.count("model-a") == 1
+
+    def test_hash_text_is_sha256(self):
+        assert hash_text("abc") == "ba7816bf8f01cfea414140de5dae2223b00361a396177a9cb410ff61f20015ad"
+
+    def test_hash_text_ignores_whitespace_changes(self):
+        assert hash_text("step one\n\n  step two ") == hash_text("step one step two")
+        assert hash_text("step one") != hash_text("stepone")
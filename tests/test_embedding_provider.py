@@ -0,0 +1,30 @@
+"""Unit tests for the embedding providers."""
+
+import threading
+import time
+
+from src.rag_ing.utils.embedding_provider import AzureOpenAIEmbeddingProvider
+
+
+class TestAzureRateLimit:
+    """Tests for AzureOpenAIEmbeddingProvider._rate_limit."""
+
+    def test_concurrent_requests_are_spaced_out(self, monkeypatch):
+        monkeypatch.setattr(AzureOpenAIEmbeddingProvider, "_init_client", lambda self: None)
+        # 600 requests per minute: one every 0.1s
+        provider = AzureOpenAIEmbeddingProvider({"requests_per_minute": 600})
+        start_times = []
+
+        def request():
+            provider._rate_limit()
+            start_times.append(time.monotonic())
+
+        threads = [threading.Thread(target=request) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        start_times.sort()
+        gaps = [later - earlier for earlier, later in zip(start_times, start_times[1:])]
+        assert all(gap >= 0.09 for gap in gaps)
@@ -0,0 +1,99 @@
+"""Unit tests for evaluation logging and metric serialization."""
+
+import json
+import logging
+
+import pytest
+
+from src.rag_ing.config.settings import Settings
+from src.rag_ing.modules import evaluation_logging
+from src.rag_ing.modules.evaluation_logging import (
+    EvaluationLoggingModule,
+    GenerationMetrics,
+    QueryEvent,
+    RetrievalMetrics,
+    SystemMetrics,
+    hash_query,
+)
+
+LOG_FILES = ("evaluation.jsonl", "retrieval_metrics.jsonl", "generation_metrics.jsonl")
+
+
+@pytest.fixture
+def module(tmp_path):
+    settings = Settings()
+    settings.evaluation.logging.path = str(tmp_path)
+    settings.evaluation.metrics = ["precision_at_k", "clarity_rating"]
+    module = EvaluationLoggingModule(settings)
+    yield module
+    module.close()
+
+
+def make_event(query="what is the setup?"):
+    return QueryEvent(
+        timestamp="2025-01-01T00:00:00",
+        query=query,
+        query_hash=hash_query(query),
+        retrieval_metrics=RetrievalMetrics(precision_at_1=1.0, latency_ms=12.0),
+        generation_metrics=GenerationMetrics(clarity_score=0.9, generation_time_ms=30.0),
+    )
+
+
+def read_records(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+class TestStructuredLogging:
+    """Tests for the queued evaluation log writers."""
+
+    @pytest.mark.parametrize("finish", ["flush_logs", "close"])
+    def test_all_log_files_written(self, module, tmp_path, finish):
+        event = make_event()
+        module.log_query_event(event)
+
+        getattr(module, finish)()
+
+        for filename in LOG_FILES:
+            records = read_records(tmp_path / filename)
+            assert len(records) == 1
+            assert event.query_hash in json.dumps(records[0])
+
+    def test_flush_keeps_listener_running(self, module, tmp_path):
+        module.log_query_event(make_event("first"))
+        module.flush_logs()
+        module.log_query_event(make_event("second"))
+        module.flush_logs()
+
+        assert len(read_records(tmp_path / "evaluation.jsonl")) == 2
+
+    def test_atexit_hook_registered_once_and_removed_on_close(self, module, monkeypatch):
+        registered = []
+        monkeypatch.setattr(evaluation_logging.atexit, "register", registered.append)
+        monkeypatch.setattr(evaluation_logging.atexit, "unregister",
+                            lambda func: registered.remove(func) if func in registered else None)
+
+        module._setup_structured_logging()
+        module._setup_structured_logging()
+        assert registered == [module.close]
+
+        module.close()
+        assert registered == []
+
+    def test_records_do_not_reach_root_logger(self, module):
+        # pytest's caplog also captures non-propagating loggers, so check the flag
+        for name in ("rag_evaluation", "retrieval_metrics", "generation_metrics"):
+            assert logging.getLogger(name).propagate is False
+
+
+class TestSystemMetrics:
+    """Tests for SystemMetrics serialization."""
+
+    def test_to_dict_computes_error_rate_without_mutating(self):
+        metrics = SystemMetrics(total_queries=4, successful_queries=3, failed_queries=1)
+
+        first = metrics.to_dict()
+        second = metrics.to_dict()
+
+        assert first == second
+        assert first["error_rate"] == 0.25
+        assert metrics.error_rate is None
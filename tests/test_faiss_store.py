@@ -0,0 +1,84 @@
+"""Unit tests for FAISS vector store persistence."""
+
+import pytest
+
+pytest.importorskip("faiss")
+pytest.importorskip("langchain_community")
+
+from langchain_community.embeddings import DeterministicFakeEmbedding
+from langchain_community.vectorstores import FAISS
+
+from src.rag_ing.utils.faiss_store import (
+    DOCSTORE_FILENAME,
+    LEGACY_DOCSTORE_FILENAME,
+    get_faiss_index_path,
+    load_faiss_store,
+    save_faiss_store,
+)
+
+TEXTS = ["alpha document", "beta document", "gamma document"]
+METADATAS = [
+    {"source": "a.md", "page": 1},
+    {"source": "b.md", "tags": ["x", "y"]},
+    {"source": "c.md", "nested": {"k": "v"}},
+]
+IDS = ["id-a", "id-b", "id-c"]
+
+
+@pytest.fixture
+def embedding_model():
+    return DeterministicFakeEmbedding(size=16)
+
+
+@pytest.fixture
+def store(embedding_model):
+    return FAISS.from_texts(TEXTS, embedding_model, metadatas=METADATAS, ids=IDS)
+
+
+def assert_same_documents(loaded, original):
+    """Check ids, contents, metadata and the index -> docstore mapping."""
+    assert loaded.index.ntotal == original.index.ntotal
+    assert [loaded.index_to_docstore_id[i] for i in range(len(IDS))] == IDS
+    for doc_id, text, metadata in zip(IDS, TEXTS, METADATAS):
+        doc = loaded.docstore.search(doc_id)
+        assert doc.id == doc_id
+        assert doc.page_content == text
+        assert doc.metadata == metadata
+
+
+class TestFaissStore:
+    """Tests for save_faiss_store and load_faiss_store."""
+
+    @pytest.mark.parametrize("mmap", [True, False])
+    def test_save_and_reload_roundtrip(self, tmp_path, store, embedding_model, mmap):
+        save_faiss_store(store, str(tmp_path))
+
+        loaded = load_faiss_store(str(tmp_path), embedding_model, mmap=mmap)
+
+        assert_same_documents(loaded, store)
+        hits = loaded.similarity_search("beta document", k=1)
+        assert hits[0].page_content == "beta document"
+        assert hits[0].metadata == METADATAS[1]
+
+    def test_missing_index_returns_none(self, tmp_path, embedding_model):
+        assert load_faiss_store(str(tmp_path), embedding_model) is None
+
+    def test_load_legacy_pickle(self, tmp_path, store, embedding_model):
+        index_path = get_faiss_index_path(str(tmp_path))
+        store.save_local(str(index_path))
+        assert (index_path / LEGACY_DOCSTORE_FILENAME).exists()
+
+        loaded = load_faiss_store(str(tmp_path), embedding_model, mmap=False)
+
+        assert_same_documents(loaded, store)
+
+    def test_save_replaces_legacy_pickle(self, tmp_path, store, embedding_model):
+        index_path = get_faiss_index_path(str(tmp_path))
+        store.save_local(str(index_path))
+        legacy = load_faiss_store(str(tmp_path), embedding_model, mmap=False)
+
+        save_faiss_store(legacy, str(tmp_path))
+
+        assert not (index_path / LEGACY_DOCSTORE_FILENAME).exists()
+        assert (index_path / DOCSTORE_FILENAME).exists()
+        assert_same_documents(load_faiss_store(str(tmp_path), embedding_model), store)
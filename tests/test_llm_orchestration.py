@@ -0,0 +1,258 @@
+"""Unit tests for LLM orchestration batching, caching and context packing."""
+
+import asyncio
+import os
+
+import pytest
+
+from src.rag_ing.config.settings import Settings
+from src.rag_ing.modules import llm_orchestration
+from src.rag_ing.modules.llm_orchestration import LLMOrchestrationModule, _AsyncRateLimiter
+from src.rag_ing.utils.exceptions import LLMError
+
+
+@pytest.fixture
+def module(tmp_path, monkeypatch):
+    """Module with no live provider; tests replace the model call as needed."""
+    monkeypatch.setattr(LLMOrchestrationModule, "initialize_model", lambda self: False)
+    settings = Settings()
+    settings.llm.provider = "koboldcpp"
+    settings.llm.temperature = 0.0
+    settings.llm.prompt_template = str(tmp_path / "template.txt")
+    settings.llm.answer_formatting_prompt = str(tmp_path / "missing.txt")
+    module = LLMOrchestrationModule(settings)
+    yield module
+    module.close()
+
+
+class TestBatching:
+    """Tests for generate_responses_batch."""
+
+    def test_empty_batch_returns_no_results(self, module):
+        assert module.generate_responses_batch([], "context") == []
+
+
+class TestResponseCache:
+    """Tests for the in-process response cache."""
+
+    @pytest.fixture
+    def calls(self, module):
+        calls = []
+
+        def fake_invoke(prompt):
+            calls.append(prompt)
+            return f"Answer {len(calls)}"
+
+        module._invoke_model = fake_invoke
+        return calls
+
+    def test_repeat_request_is_served_from_cache(self, module, calls):
+        first = module.generate_response("question", "context")
+        second = module.generate_response("question", "context")
+
+        assert len(calls) == 1
+        assert second["response"] == first["response"]
+        assert second["metadata"]["cached"] is True
+
+    def test_edited_template_misses_cache(self, module, calls, tmp_path):
+        template_path = tmp_path / "template.txt"
+        template_path.write_text("Context: {context}\nQuestion: {query}")
+        module.generate_response("question", "context")
+
+        template_path.write_text("Use only this context: {context}\nQuestion: {query}")
+        os.utime(template_path, ns=(0, template_path.stat().st_mtime_ns + 1_000_000))
+        module.generate_response("question", "context")
+
+        assert len(calls) == 2
+        assert calls[1].startswith("Use only this context")
+
+    def test_use_cache_false_bypasses_cache(self, module, calls):
+        module.generate_response("question", "context")
+        result = module.generate_response("question", "context", use_cache=False)
+
+        assert len(calls) == 2
+        assert "cached" not in result["metadata"]
+
+    def test_expired_entry_is_regenerated(self, module, calls, monkeypatch):
+        module.llm_config.cache.ttl_seconds = 60
+        now = [1000.0]
+        monkeypatch.setattr(llm_orchestration.time, "monotonic", lambda: now[0])
+
+        module.generate_response("question", "context")
+        now[0] += 59
+        assert module.generate_response("question", "context")["metadata"]["cached"] is True
+        now[0] += 2
+        assert "cached" not in module.generate_response("question", "context")["metadata"]
+        assert len(calls) == 2
+
+
+class TestSingleFlight:
+    """Tests for de-duplicating identical concurrent agenerate_response calls."""
+
+    @staticmethod
+    async def run_concurrently(module, count):
+        return await asyncio.gather(
+            *(module.agenerate_response("question", "context") for _ in range(count)),
+            return_exceptions=True
+        )
+
+    def test_identical_concurrent_requests_make_one_model_call(self, module):
+        calls = []
+
+        async def fake_ainvoke(prompt):
+            calls.append(prompt)
+            await asyncio.sleep(0.05)
+            return "Answer"
+
+        module._ainvoke_model = fake_ainvoke
+        results = asyncio.run(self.run_concurrently(module, 3))
+
+        assert len(calls) == 1
+        assert [result["response"] for result in results] == ["Answer"] * 3
+        assert module._in_flight == {}
+
+    def test_failed_leader_lets_waiters_retry(self, module):
+        calls = []
+
+        async def fake_ainvoke(prompt):
+            calls.append(prompt)
+            await asyncio.sleep(0.05)
+            if len(calls) == 1:
+                raise RuntimeError("provider unavailable")
+            return "Answer"
+
+        module._ainvoke_model = fake_ainvoke
+        results = asyncio.run(self.run_concurrently(module, 3))
+
+        assert isinstance(results[0], LLMError)
+        assert [result["response"] for result in results[1:]] == ["Answer"] * 2
+        assert len(calls) == 3
+        assert module._in_flight == {}
+
+
+class TestAsyncClients:
+    """Tests for running async calls from callers' own event loops."""
+
+    @pytest.fixture
+    def prompts(self, module):
+        prompts = []
+
+        async def fake_ainvoke_koboldcpp(prompt):
+            prompts.append(prompt)
+            return "Answer"
+
+        async def fake_astream_koboldcpp(prompt):
+            prompts.append(prompt)
+            for text in ("An", "swer"):
+                yield text
+
+        module._ainvoke_koboldcpp = fake_ainvoke_koboldcpp
+        module._astream_koboldcpp = fake_astream_koboldcpp
+        return prompts
+
+    def test_clients_are_shared_across_caller_loops(self, module, prompts):
+        asyncio.run(module.agenerate_response("question", "context", use_cache=False))
+        client = module._ahttp
+        asyncio.run(module.agenerate_response("question", "context", use_cache=False))
+
+        assert len(prompts) == 2
+        assert module._ahttp is client
+        assert module._async_loop is module._background_loop
+
+    def test_close_closes_clients(self, module, prompts):
+        asyncio.run(module.agenerate_response("question", "context"))
+        client = module._ahttp
+
+        module.close()
+
+        assert client.is_closed
+        assert module._ahttp is None
+
+    def test_stream_from_caller_loop(self, module, prompts):
+        async def collect():
+            return [text async for text in module.astream_response("question", "context")]
+
+        assert asyncio.run(collect()) == ["An", "swer"]
+        assert module._async_loop is module._background_loop
+
+
+class TestAsyncRateLimiter:
+    """Tests for the async token bucket."""
+
+    def test_limiter_spaces_out_start_times(self):
+        # 2 requests per 0.2s: a burst of two, then one every 0.1s
+        limiter = _AsyncRateLimiter(rate=2, period=0.2)
+
+        async def start_times():
+            loop = asyncio.get_running_loop()
+            times = []
+            for _ in range(5):
+                await limiter.acquire()
+                times.append(loop.time())
+            return times
+
+        times = asyncio.run(start_times())
+        offsets = [t - times[0] for t in times]
+
+        assert offsets[1] < 0.05
+        for i in range(2, 5):
+            assert offsets[i] >= (i - 1) * 0.1 - 0.01
+
+
+class TestTruncatedContext:
+    """Tests for packing scored documents into a token budget."""
+
+    def test_document_that_does_not_fit_is_skipped(self, module):
+        scored_docs = [("alpha", 10.0, 1000), ("beta", 3.0, 100), ("gamma", 2.0, 100)]
+
+        context = module._build_truncated_context(scored_docs, 300)
+
+        assert "alpha" not in context
+        assert "beta" in context and "gamma" in context
+
+    def test_best_single_document_replaces_weaker_picks(self, module):
+        scored_docs = [("alpha", 50.0, 1000), ("beta", 1.0, 10), ("gamma", 1.0, 10)]
+
+        context = module._build_truncated_context(scored_docs, 1010)
+
+        assert "alpha" in context
+        assert "beta" not in context and "gamma" not in context
+
+    def test_left_over_space_holds_partial_document(self, module):
+        long_doc = "alpha " * 1000
+        scored_docs = [(long_doc, 10.0, module._count_tokens(long_doc)), ("beta", 3.0, 100)]
+
+        context = module._build_truncated_context(scored_docs, 400)
+
+        assert "beta" in context
+        assert "alpha" in context and context.endswith("...[truncated]")
+        assert module._count_tokens(context) <= 400
+
+    def test_documents_keep_relevance_order(self, module):
+        # beta packs better per token, but alpha scores higher and comes first
+        scored_docs = [("alpha", 10.0, 100), ("beta", 5.0, 10)]
+
+        context = module._build_truncated_context(scored_docs, 1000)
+
+        assert context.index("alpha") < context.index("beta")
+
+
+class TestExtractDocuments:
+    """Tests for splitting a retrieved context into documents."""
+
+    def test_splits_on_separators_at_line_start(self, module):
+        context = "Source: a.md\nfirst -- not --- a break\n\nSource: b.md\nsecond\n###\nthird"
+
+        documents = module._extract_documents_from_context(context)
+
+        assert documents == ["a.md\nfirst -- not --- a break", "b.md\nsecond", "third"]
+
+    def test_markdown_headings_stay_in_their_document(self, module):
+        context = "Source: guide.md\n### Setup\nInstall it.\n### Usage\nRun it.\n\nSource: faq.md\nAsk."
+
+        documents = module._extract_documents_from_context(context)
+
+        assert documents == ["guide.md\n### Setup\nInstall it.\n### Usage\nRun it.", "faq.md\nAsk."]
+
+    def test_context_without_separators_is_one_document(self, module):
+        assert module._extract_documents_from_context("plain text") == ["plain text"]